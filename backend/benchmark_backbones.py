@@ -0,0 +1,119 @@
+"""
+Feature extractor omurgalarını karşılaştırır (ResNet50, ResNet18, MobileNetV3,
+EfficientNet-B0). Dataset görselleri sabit tohumla referans / sorgu olarak
+ayrılır; her omurga için:
+    - doğruluk: sorgu görsellerinin kNN oylamasıyla doğru sınıflandırılma oranı
+    - boyut ve store belleği (N x boyut x 4 byte)
+    - çıkarma hızı (görsel/sn), batch=1 forward gecikmesi (ort / p95)
+    - sorgu başına arama süresi
+    - model RSS artışı (ayrı süreçte ölçülür)
+
+Kullanım:
+    python benchmark_backbones.py
+    python benchmark_backbones.py --backbones resnet50 mobilenet_v3_large --queries 0.3
+
+Seçilen omurga ile servis için:
+    python build_features.py --backbone mobilenet_v3_large
+    ECOSCAN_BACKBONE=mobilenet_v3_large python main.py
+"""
+import argparse
+import multiprocessing
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmark_quantization import measure_latency, measure_rss, preprocess
+from export_model import sample_images
+from utils.embedding_engine import EmbeddingEngine
+from utils.feature_extraction import extract_features_batched
+from utils.inference_backends import BACKBONES, TorchBackend
+from utils.vector_index import ExactIndex, normalize_rows, vote
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Omurga doğruluk / gecikme / bellek raporu")
+    parser.add_argument("--backbones", nargs="+", default=list(BACKBONES), choices=list(BACKBONES))
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--max-images", type=int, default=2000,
+                        help="Kategoriler arasında dengeli seçilecek en fazla görsel")
+    parser.add_argument("--queries", type=float, default=0.2, help="Sorgu olarak ayrılacak oran")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=20, help="Gecikme ölçümü tekrar sayısı")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not Path(args.dataset).exists():
+        print(f"❌ {args.dataset} bulunamadı")
+        return
+
+    paths = sample_images(args.dataset, args.max_images)
+    if len(paths) < 2:
+        print("❌ Karşılaştırma için yeterli görsel yok")
+        return
+    labels = [Path(p).parent.name.lower() for p in paths]
+
+    # Tüm omurgalar aynı ayrımı kullanır
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(paths))
+    n_queries = max(1, int(len(paths) * args.queries))
+    query_idx, base_idx = order[:n_queries], order[n_queries:]
+    print(f"📊 {len(base_idx)} referans görsel, {len(query_idx)} sorgu")
+
+    transform = EmbeddingEngine.make_transform()
+    single = preprocess([paths[query_idx[0]]])
+    context = multiprocessing.get_context("spawn")
+
+    rows = []
+    for backbone in args.backbones:
+        print(f"\n🔄 {backbone}")
+        embed = TorchBackend(backbone=backbone)
+
+        start = time.perf_counter()
+        # Servisle aynı decode yolu (JPEG draft + EXIF), bkz. utils/image_decode.py
+        vectors = extract_features_batched(embed, transform, paths, batch_size=args.batch_size,
+                                           num_workers=args.workers, progress=False,
+                                           decode_size=EmbeddingEngine.DECODE_SIZE)
+        throughput = len(paths) / max(time.perf_counter() - start, 1e-9)
+        forward_ms = measure_latency(embed, single, args.repeats)
+        del embed
+
+        valid = [i for i, v in enumerate(vectors) if v is not None]
+        if not valid:
+            print("  ⚠️ Hiçbir görselden özellik çıkarılamadı")
+            continue
+        dim = len(vectors[valid[0]])
+        matrix = normalize_rows(np.stack([
+            vectors[i] if vectors[i] is not None else np.zeros(dim, dtype=np.float32)
+            for i in range(len(paths))
+        ]))
+
+        base = [i for i in base_idx if vectors[i] is not None]
+        queries = [i for i in query_idx if vectors[i] is not None]
+        base_labels = [labels[i] for i in base]
+        index = ExactIndex().build(matrix[base])
+
+        search_start = time.perf_counter()
+        results = index.search_batch(matrix[queries], args.top_k)
+        search_ms = (time.perf_counter() - search_start) * 1000 / max(len(queries), 1)
+
+        votes = [vote(ids, scores, base_labels) for ids, scores in results]
+        accuracy = np.mean([v == labels[i] for v, i in zip(votes, queries)])
+
+        with context.Pool(1) as pool:
+            rss_mb, _ = pool.apply(measure_rss, ("torch", None, backbone))
+
+        rows.append((backbone, dim, accuracy, throughput, forward_ms, search_ms,
+                     len(paths) * dim * 4 / 1e6, rss_mb))
+
+    print(f"\n{'omurga':<20}{'boyut':>7}{'doğruluk':>10}{'görsel/sn':>11}{'b=1 ms':>9}"
+          f"{'p95 ms':>9}{'arama ms':>10}{'store MB':>10}{'model MB':>10}")
+    for backbone, dim, accuracy, throughput, forward_ms, search_ms, store_mb, rss_mb in rows:
+        print(f"{backbone:<20}{dim:>7}{accuracy:>10.3f}{throughput:>11.1f}{forward_ms.mean():>9.1f}"
+              f"{np.percentile(forward_ms, 95):>9.1f}{search_ms:>10.3f}{store_mb:>10.1f}{rss_mb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
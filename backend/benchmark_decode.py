@@ -0,0 +1,145 @@
+"""
+Upload decode yolunun karşılaştırması: tam çözünürlükte decode ile JPEG draft
+(DCT ölçeklemeli) decode (bkz. utils/image_decode.py):
+
+    - süre: görsel başına decode ve decode + ön işleme (224x224 model girdisi)
+    - tepe bellek: her yol için temiz bir süreçte en büyük upload'u açmanın
+      neden olduğu tepe RSS artışı (Linux /proc)
+    - fark: iki yolun model girdileri arasındaki ortalama mutlak fark ve
+      omurga embedding'lerinin cosine benzerliği
+
+Büyük upload'lar dataset görsellerinden telefon fotoğrafı boyutuna (varsayılan
+12 MP) büyütülüp JPEG olarak kodlanır.
+
+Kullanım:
+    python benchmark_decode.py
+    python benchmark_decode.py --megapixels 12 48 --images 16 --no-model
+"""
+import argparse
+import io
+import multiprocessing
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from benchmark_quantization import memory_mb
+from utils.embedding_engine import EmbeddingEngine
+from utils.image_decode import load_image
+from utils.inference_backends import BACKBONES, DEFAULT_BACKBONE, Preprocess, create_backend
+
+MODES = {"tam": None, "draft": EmbeddingEngine.DECODE_SIZE}
+
+
+def make_uploads(paths, megapixels, quality):
+    """Dataset görsellerini en-boy oranını koruyarak megapixels boyutunda JPEG'e çevir"""
+    uploads = []
+    for path in paths:
+        with Image.open(path) as img:
+            img = img.convert('RGB')
+            scale = (megapixels * 1e6 / (img.width * img.height)) ** 0.5
+            img = img.resize((round(img.width * scale), round(img.height * scale)), Image.BILINEAR)
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=quality)
+        uploads.append(buffer.getvalue())
+    return uploads
+
+
+def make_transform():
+    return Preprocess(
+        size=EmbeddingEngine.PREPROCESSING['resize'],
+        mean=EmbeddingEngine.PREPROCESSING['mean'],
+        std=EmbeddingEngine.PREPROCESSING['std']
+    )
+
+
+def measure_time(uploads, size, transform, repeats):
+    """(decode ms, decode + ön işleme ms) dizileri; ilk tur ısınma sayılmaz"""
+    decode_ms, total_ms = [], []
+    for round_no in range(repeats + 1):
+        for contents in uploads:
+            start = time.perf_counter()
+            img = load_image(contents, size)
+            decoded = time.perf_counter()
+            transform(img)
+            end = time.perf_counter()
+            if round_no:
+                decode_ms.append((decoded - start) * 1000)
+                total_ms.append((end - start) * 1000)
+    return np.array(decode_ms), np.array(total_ms)
+
+
+def measure_peak(contents, size):
+    """Ayrı süreçte çalışır: bir upload'u decode + ön işle; tepe RSS artışı (MB)"""
+    before, _ = memory_mb()
+    make_transform()(load_image(contents, size))
+    _, peak = memory_mb()
+    return peak - before
+
+
+def compare_outputs(uploads, transform, embed):
+    """İki yolun model girdisi farkı ve (embed verilirse) embedding cosine benzerlikleri"""
+    full = np.stack([transform(load_image(c, MODES["tam"])) for c in uploads])
+    fast = np.stack([transform(load_image(c, MODES["draft"])) for c in uploads])
+    input_diff = float(np.abs(full - fast).mean())
+    if embed is None:
+        return input_diff, None
+
+    a, b = embed(full), embed(fast)
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return input_diff, cosine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tam / draft JPEG decode karşılaştırması")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--images", type=int, default=8, help="Kullanılacak dataset görseli sayısı")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12.0])
+    parser.add_argument("--quality", type=int, default=90, help="Üretilen upload'ların JPEG kalitesi")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--backbone", default=DEFAULT_BACKBONE, choices=list(BACKBONES))
+    parser.add_argument("--no-model", action="store_true", help="Embedding karşılaştırmasını atla")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.dataset).glob("*/*")
+                   if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    if not paths:
+        print(f"❌ {args.dataset} içinde görsel bulunamadı")
+        return
+    rng = np.random.default_rng(args.seed)
+    paths = [paths[i] for i in rng.choice(len(paths), min(args.images, len(paths)), replace=False)]
+
+    transform = make_transform()
+    embed = None if args.no_model else create_backend("torch", None, args.backbone)
+    # Tepe bellek her ölçüm için temiz bir süreçte
+    context = multiprocessing.get_context("spawn")
+
+    for megapixels in args.megapixels:
+        uploads = make_uploads(paths, megapixels, args.quality)
+        largest = max(uploads, key=len)
+        print(f"\n📊 {len(uploads)} upload, ~{megapixels:g} MP, "
+              f"ort. {np.mean([len(u) for u in uploads]) / 1e6:.1f} MB")
+        print(f"{'yol':<8}{'decode ms':>11}{'p95':>9}{'+ön işleme':>12}{'p95':>9}{'tepe MB':>10}")
+
+        results = {}
+        for mode, size in MODES.items():
+            decode_ms, total_ms = measure_time(uploads, size, transform, args.repeats)
+            with context.Pool(1) as pool:
+                peak_mb = pool.apply(measure_peak, (largest, size))
+            results[mode] = (decode_ms.mean(), peak_mb)
+            print(f"{mode:<8}{decode_ms.mean():>11.1f}{np.percentile(decode_ms, 95):>9.1f}"
+                  f"{total_ms.mean():>12.1f}{np.percentile(total_ms, 95):>9.1f}{peak_mb:>10.0f}")
+
+        (full_ms, full_mb), (fast_ms, fast_mb) = results["tam"], results["draft"]
+        print(f"⚡ decode {full_ms / fast_ms:.1f}x hızlı, tepe bellek {full_mb - fast_mb:.0f} MB az")
+
+        input_diff, cosine = compare_outputs(uploads, transform, embed)
+        print(f"🎯 model girdisi ort. mutlak fark: {input_diff:.4f}")
+        if cosine is not None:
+            print(f"🎯 embedding cosine (tam vs draft): ort. {cosine.mean():.4f}, en düşük {cosine.min():.4f}")
+
+
+if __name__ == "__main__":
+    main()
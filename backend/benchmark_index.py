@@ -0,0 +1,152 @@
+"""
+Arama indekslerini karşılaştırır: exact vs yaklaşık (IVF) vs sıkıştırılmış (PCA, PQ).
+Feature store'daki vektörlerin bir kısmı sorgu olarak ayrılır, kalanlar indekslenir;
+her nprobe / PCA boyutu / PQ alt uzay sayısı için recall@k, oylama uyumu, sorgu
+süresi ve indeksin bellek kullanımı raporlanır.
+
+Kullanım:
+    python build_features.py            # önce feature_store/ oluşturun
+    python benchmark_index.py --nprobe 1 2 4 8 16
+    python benchmark_index.py --pca-dim 128 256 --pq-m 32 64
+    python benchmark_index.py --margins 0.02 0.05 0.1   # prototip hızlı yolu eşikleri
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.centroid_classifier import CentroidClassifier
+from utils.feature_store import FeatureStore, load_legacy_pickle
+from utils.vector_index import ExactIndex, IVFIndex, PCAIndex, PQIndex, vote
+from utils.waste_detector import WasteDetector
+
+
+def load_features(path):
+    """Feature store (veya eski features.pkl) içinden (normalize matris, etiketler) oku"""
+    path = Path(path)
+    if path.suffix == ".pkl":
+        store = load_legacy_pickle(path, WasteDetector.MODEL_ID, WasteDetector.PREPROCESSING)
+    else:
+        store = FeatureStore.open(path)
+
+    labels = [store.categories[i] for i in store.labels]
+    return np.asarray(store.vectors), labels
+
+
+def run_queries(index, queries, top_k):
+    """Tüm sorguları çalıştır; sonuçlar ve sorgu başına süreler (ms)"""
+    results = []
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, top_k))
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, np.array(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="İndeks recall / gecikme raporu")
+    parser.add_argument("--features", default="feature_store",
+                        help="Feature store klasörü veya eski features.pkl")
+    parser.add_argument("--queries", type=float, default=0.1, help="Sorgu olarak ayrılacak oran")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--nlist", type=int, default=None, help="Varsayılan: sqrt(N)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--pca-dim", type=int, nargs="*", default=[128, 256])
+    parser.add_argument("--pq-m", type=int, nargs="*", default=[32, 64])
+    parser.add_argument("--margins", type=float, nargs="*", default=[0.02, 0.05, 0.1],
+                        help="Hızlı yol (kategori prototipi) margin eşikleri")
+    parser.add_argument("--prototypes", type=int, default=1, help="Kategori başına prototip")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not Path(args.features).exists():
+        print(f"❌ {args.features} bulunamadı, önce 'python build_features.py' çalıştırın")
+        return
+
+    matrix, labels = load_features(args.features)
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(matrix))
+    n_queries = max(1, int(len(matrix) * args.queries))
+    query_idx, base_idx = order[:n_queries], order[n_queries:]
+
+    base = matrix[base_idx]
+    base_labels = [labels[i] for i in base_idx]
+    queries = matrix[query_idx]
+
+    print(f"📊 {len(base)} referans vektör, {len(queries)} sorgu, boyut {matrix.shape[1]}")
+
+    exact = ExactIndex().build(base)
+    exact_results, exact_ms = run_queries(exact, queries, args.top_k)
+    exact_votes = [vote(ids, scores, base_labels) for ids, scores in exact_results]
+    true_labels = [labels[i] for i in query_idx]
+    exact_acc = np.mean([v == t for v, t in zip(exact_votes, true_labels)])
+
+    print(f"\n{'indeks':<14}{'recall@k':>10}{'oy uyumu':>10}{'doğruluk':>10}{'ort ms':>9}{'p95 ms':>9}"
+          f"{'MB':>9}")
+    print(f"{'exact':<14}{1.0:>10.3f}{1.0:>10.3f}{exact_acc:>10.3f}"
+          f"{exact_ms.mean():>9.3f}{np.percentile(exact_ms, 95):>9.3f}"
+          f"{exact.memory_bytes() / 1e6:>9.2f}")
+    
+    def report(name, index):
+        results, timings = run_queries(index, queries, args.top_k)
+        recall = np.mean([
+            len(set(a[0]) & set(b[0])) / max(1, len(b[0]))
+            for a, b in zip(results, exact_results)
+        ])
+        votes = [vote(ids, scores, base_labels) for ids, scores in results]
+        agreement = np.mean([a == b for a, b in zip(votes, exact_votes)])
+        accuracy = np.mean([v == t for v, t in zip(votes, true_labels)])
+        print(f"{name:<14}{recall:>10.3f}{agreement:>10.3f}{accuracy:>10.3f}"
+              f"{timings.mean():>9.3f}{np.percentile(timings, 95):>9.3f}"
+              f"{index.memory_bytes() / 1e6:>9.2f}")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(nlist=args.nlist, seed=args.seed).build(base)
+    build_s = time.perf_counter() - start
+
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        report(f"ivf/{nprobe}", ivf)
+
+    for dim in args.pca_dim:
+        report(f"pca/{dim}", PCAIndex(dim=dim).build(base))
+
+    for m in args.pq_m:
+        if base.shape[1] % m:
+            print(f"{'pq/' + str(m):<14}  atlandı: boyut {base.shape[1]} m={m}'e bölünmüyor")
+            continue
+        report(f"pq/{m}", PQIndex(m=m, seed=args.seed).build(base))
+
+    print(f"\nℹ️  IVF kurulumu: {build_s:.2f} sn, nlist={len(ivf.centroids)}")
+
+    if args.margins:
+        report_fast_path(args, base, base_labels, queries, exact_votes, true_labels)
+
+
+def report_fast_path(args, base, base_labels, queries, exact_votes, true_labels):
+    """Her margin eşiği için hızlı yol oranı ve kNN'e düşenlerle birlikte oy uyumu"""
+    names = sorted(set(base_labels))
+    classifier = CentroidClassifier(prototypes=args.prototypes, seed=args.seed).build(
+        base, [names.index(label) for label in base_labels], len(names)
+    )
+    decisions = classifier.classify(queries)
+    
+    print(f"\n{'hızlı yol':<14}{'oran':>10}{'oy uyumu':>10}{'doğruluk':>10}{'yol uyumu':>11}")
+    for margin in args.margins:
+        fast = [score >= 0.3 and gap >= margin for _, score, gap, _ in decisions]
+        centroid_votes = [names[best] for best, _, _, _ in decisions]
+        # Hızlı yolu geçemeyenler exact kNN oyunu kullanır
+        votes = [c if f else v for c, f, v in zip(centroid_votes, fast, exact_votes)]
+        # Sadece hızlı yolun cevapladıkları: prototip kararı kNN ile aynı mı?
+        answered = [c == v for c, f, v in zip(centroid_votes, fast, exact_votes) if f]
+        fast_agreement = np.mean(answered) if answered else float('nan')
+        print(f"{'margin/' + str(margin):<14}{np.mean(fast):>10.3f}"
+              f"{np.mean([a == b for a, b in zip(votes, exact_votes)]):>10.3f}"
+              f"{np.mean([v == t for v, t in zip(votes, true_labels)]):>10.3f}"
+              f"{fast_agreement:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
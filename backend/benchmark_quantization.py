@@ -0,0 +1,148 @@
+"""
+Float ve int8 (quantize) feature extractor'ı karşılaştırır:
+    - top-1 uyumu: aynı sorgu görselleri için iki modelin oylama sonucu
+    - doğruluk: ayrılan sorgu görsellerinde gerçek kategoriyle eşleşme
+    - gecikme: batch=1 ve batch=8 forward süreleri
+    - RSS: ayrı bir süreçte modelin yüklenip bir forward çalıştırılmasıyla
+      oluşan bellek artışı ve sürecin tepe RSS'i (Linux /proc)
+
+Kullanım:
+    python export_model.py --format int8
+    python build_features.py                    # feature_store/
+    python build_features.py --backend int8     # feature_store_int8/
+    python benchmark_quantization.py
+"""
+import argparse
+import multiprocessing
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.embedding_engine import EmbeddingEngine
+from utils.feature_store import FeatureStore
+from utils.inference_backends import BACKBONES, BACKENDS, DEFAULT_BACKBONE, create_backend
+from utils.vector_index import ExactIndex, vote
+from utils.waste_detector import WasteDetector
+
+
+def open_store(path):
+    store = FeatureStore.open(path)
+    vectors = np.asarray(store.vectors)
+    return {p: (vectors[i], store.categories[store.labels[i]]) for i, p in enumerate(store.paths)}
+
+
+def predict(store, base_paths, query_paths, top_k):
+    """Sorguları sadece base görsellerinden oluşan exact indekste oyla"""
+    base = np.stack([store[p][0] for p in base_paths])
+    base_labels = [store[p][1] for p in base_paths]
+    queries = np.stack([store[p][0] for p in query_paths])
+    index = ExactIndex().build(base)
+    return [vote(ids, scores, base_labels) for ids, scores in index.search_batch(queries, top_k)]
+
+
+def preprocess(paths):
+    """Gecikme ölçümü için servisle aynı decode + ön işleme ile batch"""
+    return EmbeddingEngine.preprocess_files(paths)
+
+
+def measure_latency(embed, batch, repeats):
+    """Batch üzerinde forward süreleri (ms); ilk çağrı ısınma olarak sayılmaz"""
+    embed(batch)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embed(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+
+def memory_mb():
+    """(güncel RSS, tepe RSS) MB; ru_maxrss exec'ten sonra sıfırlanmadığı için /proc kullanılır"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(value.split()[0]) / 1024
+    return values["VmRSS"], values["VmHWM"]
+
+
+def measure_rss(name, path, backbone=DEFAULT_BACKBONE):
+    """Ayrı süreçte çalışır: modeli yükle, bir forward yap; (model RSS artışı, tepe RSS) döndür"""
+    before, _ = memory_mb()
+    embed = create_backend(name, path, backbone)
+    embed(np.zeros((1, 3, *WasteDetector.PREPROCESSING['resize']), dtype=np.float32))
+    after, peak = memory_mb()
+    return after - before, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Float / int8 model karşılaştırma raporu")
+    parser.add_argument("--backbone", default=DEFAULT_BACKBONE, choices=list(BACKBONES))
+    parser.add_argument("--float-backend", default="torch", choices=sorted(BACKENDS))
+    parser.add_argument("--float-path", default=None)
+    parser.add_argument("--int8-path", default=None)
+    parser.add_argument("--float-store", default=None, help="Varsayılan: omurganın float store'u")
+    parser.add_argument("--int8-store", default=None, help="Varsayılan: omurganın int8 store'u")
+    parser.add_argument("--queries", type=float, default=0.2, help="Sorgu olarak ayrılacak oran")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20, help="Gecikme ölçümü tekrar sayısı")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.float_store = args.float_store or WasteDetector.default_store_path(args.backbone)
+    args.int8_store = args.int8_store or WasteDetector.default_store_path(args.backbone, "int8")
+
+    for path, backend in ((args.float_store, ""), (args.int8_store, " --backend int8")):
+        if not Path(path).exists():
+            print(f"❌ {path} bulunamadı, önce 'python build_features.py{backend}' çalıştırın")
+            return
+
+    float_store = open_store(args.float_store)
+    int8_store = open_store(args.int8_store)
+    paths = sorted(set(float_store) & set(int8_store))
+    if len(paths) < 2:
+        print("❌ İki store'da ortak görsel bulunamadı")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(paths))
+    n_queries = max(1, int(len(paths) * args.queries))
+    query_paths = [paths[i] for i in order[:n_queries]]
+    base_paths = [paths[i] for i in order[n_queries:]]
+    true_labels = [float_store[p][1] for p in query_paths]
+
+    float_votes = predict(float_store, base_paths, query_paths, args.top_k)
+    int8_votes = predict(int8_store, base_paths, query_paths, args.top_k)
+    agreement = np.mean([a == b for a, b in zip(float_votes, int8_votes)])
+
+    print(f"📊 {len(base_paths)} referans görsel, {len(query_paths)} sorgu")
+
+    batch = preprocess(query_paths[:8])
+    models = (
+        (args.float_backend, args.float_path, float_votes),
+        ("int8", args.int8_path, int8_votes),
+    )
+
+    # RSS her model için temiz bir süreçte ölçülür
+    context = multiprocessing.get_context("spawn")
+    print(f"\n{'model':<14}{'doğruluk':>10}{'b=1 ms':>10}{'b=8 ms':>10}{'p95 b=1':>10}"
+          f"{'model MB':>10}{'tepe MB':>10}")
+    for name, path, votes in models:
+        embed = create_backend(name, path, args.backbone)
+        single_ms = measure_latency(embed, batch[:1], args.repeats)
+        batch_ms = measure_latency(embed, batch, max(1, args.repeats // 4))
+        del embed
+
+        with context.Pool(1) as pool:
+            rss_mb, peak_mb = pool.apply(measure_rss, (name, path, args.backbone))
+
+        accuracy = np.mean([v == t for v, t in zip(votes, true_labels)])
+        print(f"{name:<14}{accuracy:>10.3f}{single_ms.mean():>10.1f}{batch_ms.mean():>10.1f}"
+              f"{np.percentile(single_ms, 95):>10.1f}{rss_mb:>10.0f}{peak_mb:>10.0f}")
+
+    print(f"\n🎯 top-1 uyumu (float vs int8): {agreement:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Tespit servisinin gecikme / verim ölçümü (gerçek dataset görselleriyle, yerel):
+
+    - aşamalar: decode, preprocess, forward (batch=1), arama, oylama (ya da
+      başlık / prototip sınıflandırması, YOLO'da tek tahmin adımı) ayrı ayrı
+    - detect: WasteDetector.detect uçtan uca (sonuç önbelleği kapalı)
+    - yük testi: FastAPI uygulaması süreç içinde (ASGI), verilen eşzamanlılık
+      seviyelerinde /api/analyze; p50/p95/p99, istek/sn, hata sayısı
+    - bellek: sürecin güncel ve tepe RSS'i
+
+Servis ile aynı ayarlar kullanılır (ECOSCAN_ENGINE, ECOSCAN_BACKEND, ECOSCAN_INDEX, ...);
+istek başına log satırları DEBUG seviyesinde olduğu için ölçüme karışmaz.
+Sonuçlar JSON olarak yazılır; --baseline ile önceki bir çalıştırmayla karşılaştırılır ve
+p95 / ortalama süre --max-regression oranından fazla artarsa çıkış kodu 1 olur.
+
+Kullanım:
+    python benchmark_service.py
+    python benchmark_service.py --concurrency 1 8 32 --requests 400 --output bench.json
+    ECOSCAN_BACKEND=onnx python benchmark_service.py --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Yük testinde tekrar eden görseller önbellekten dönmesin
+os.environ.setdefault("ECOSCAN_CACHE_MB", "0")
+
+import numpy as np
+
+from benchmark_quantization import memory_mb
+from utils.image_decode import load_image
+
+
+def summarize(timings_ms):
+    timings = np.asarray(timings_ms, dtype=np.float64)
+    return {
+        "mean_ms": round(float(timings.mean()), 3),
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, (time.perf_counter() - start) * 1000
+
+
+def measure_stages(detector, images, repeats):
+    """Her görsel için aşama süreleri (ms); ilk tur ısınma sayılmaz"""
+    stages = {}
+
+    def record(name, ms):
+        stages.setdefault(name, []).append(ms)
+
+    for round_no in range(repeats + 1):
+        for contents in images:
+            decode_size = detector.embedder.decode_size if detector.embedder else None
+            decoded, decode_ms = timed(load_image, contents, decode_size)
+
+            if detector.yolo is not None:
+                _, predict_ms = timed(detector.yolo.predict, [decoded])
+                if round_no:
+                    record("decode", decode_ms)
+                    record("yolo", predict_ms)
+                continue
+
+            tensor, preprocess_ms = timed(detector.embedder.transform, decoded)
+            features, forward_ms = timed(detector.embedder.embed, tensor[None])
+            if round_no:
+                record("decode", decode_ms)
+                record("preprocess", preprocess_ms)
+                record("forward", forward_ms)
+
+            if detector.head is not None:
+                _, head_ms = timed(detector._classify_head, [features[0]])
+                if round_no:
+                    record("head", head_ms)
+                continue
+            if len(detector.centroids):
+                _, centroid_ms = timed(detector._classify_centroids, [features[0]])
+                if round_no:
+                    record("centroid", centroid_ms)
+            similar, search_ms = timed(detector.embedder.search_many, [features[0]], 20)
+            _, vote_ms = timed(detector._classify, similar[0])
+            if round_no:
+                record("search", search_ms)
+                record("vote", vote_ms)
+
+    return {name: summarize(values) for name, values in stages.items()}
+
+
+def measure_detect(detector, images, repeats):
+    timings = []
+    detector.detect(images[0])
+    for _ in range(repeats):
+        for contents in images:
+            timings.append(timed(detector.detect, contents)[1])
+    return summarize(timings)
+
+
+async def load_test(app, images, concurrency, total):
+    """total isteği concurrency eşzamanlı istemciyle gönder"""
+    import httpx
+
+    # İstemcinin istek başına INFO satırları tabloyu bölmesin
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client_loop(client):
+        nonlocal errors
+        for i in counter:
+            contents = images[i % len(images)]
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/analyze", files={"file": ("image.jpg", contents, "image/jpeg")}
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code >= 500
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 2),
+        **summarize(latencies),
+    }
+
+
+def compare(result, baseline, max_regression, noise_ms=1.0):
+    """Ortak ölçümlerde değişim oranı; eşik aşılırsa False (noise_ms altındaki artışlar sayılmaz)"""
+    rows = []
+    for name, stats in result["stages"].items():
+        if name in baseline.get("stages", {}):
+            rows.append((f"aşama {name} (ort.)", baseline["stages"][name]["mean_ms"], stats["mean_ms"]))
+    rows.append(("detect p95", baseline["detect"]["p95_ms"], result["detect"]["p95_ms"]))
+    previous = {row["concurrency"]: row for row in baseline.get("load", [])}
+    for row in result["load"]:
+        if row["concurrency"] in previous:
+            rows.append((f"yük c={row['concurrency']} p95", previous[row["concurrency"]]["p95_ms"],
+                         row["p95_ms"]))
+
+    ok = True
+    print(f"\n{'ölçüm':<26}{'önce ms':>10}{'şimdi ms':>10}{'değişim':>10}")
+    for name, before, after in rows:
+        change = (after - before) / before if before else 0.0
+        regressed = change > max_regression and after - before > noise_ms
+        ok = ok and not regressed
+        print(f"{name:<26}{before:>10.2f}{after:>10.2f}{change:>+10.1%}{'  ❌' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tespit servisi gecikme / verim ölçümü")
+    parser.add_argument("--images", type=int, default=32, help="Kullanılacak dataset görseli sayısı")
+    parser.add_argument("--repeats", type=int, default=3, help="Aşama / detect ölçüm turu")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Eşzamanlılık seviyesi başına istek")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_service.json")
+    parser.add_argument("--baseline", default=None, help="Karşılaştırılacak önceki JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="İzin verilen en büyük yavaşlama oranı (0.2 = %%20)")
+    args = parser.parse_args()
+
+    import main as service
+
+    print("🔄 Model yükleniyor...")
+    service.load_model()
+    detector = service.detector
+    if service.model_state["status"] != "ready":
+        print(f"❌ Servis hazır değil: {service.model_state['error']}")
+        sys.exit(1)
+
+    rng = np.random.default_rng(args.seed)
+    dataset_path = detector.dataset_path
+    paths = sorted(str(path) for path in dataset_path.glob("*/*")
+                   if path.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    if not paths:
+        print(f"❌ {dataset_path} içinde görsel bulunamadı")
+        sys.exit(1)
+    chosen = rng.choice(len(paths), min(args.images, len(paths)), replace=False)
+    images = [Path(paths[i]).read_bytes() for i in chosen]
+    print(f"📊 {len(images)} görsel, engine={detector.engine}, backend={detector.backend}, "
+          f"omurga={detector.backbone}, indeks={detector.index_type}")
+
+    stages = measure_stages(detector, images, args.repeats)
+    print(f"\n{'aşama':<12}{'ort. ms':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in stages.items():
+        print(f"{name:<12}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+    detect = measure_detect(detector, images, args.repeats)
+    print(f"{'detect':<12}{detect['mean_ms']:>10.2f}{detect['p50_ms']:>10.2f}"
+          f"{detect['p95_ms']:>10.2f}{detect['p99_ms']:>10.2f}")
+
+    load = []
+    print(f"\n{'eşzamanlı':<12}{'istek/sn':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'hata':>8}")
+    for concurrency in args.concurrency:
+        row = asyncio.run(load_test(service.app, images, concurrency, args.requests))
+        load.append(row)
+        print(f"{concurrency:<12}{row['requests_per_sec']:>10.1f}{row['p50_ms']:>10.1f}"
+              f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['errors']:>8}")
+
+    rss_mb, peak_mb = memory_mb()
+    print(f"\n💾 RSS: {rss_mb:.0f} MB (tepe {peak_mb:.0f} MB)")
+    service.batcher.stop()
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "engine": detector.engine,
+            "backend": detector.backend,
+            "backbone": detector.backbone,
+            "index": detector.index_type,
+            "fast_path_margin": detector.fast_path_margin,
+            "fast_path_temperature": detector.fast_path_temperature,
+            "max_batch": service.batcher.max_batch_size,
+            "images": len(images),
+        },
+        "system": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "stages": stages,
+        "detect": detect,
+        "load": load,
+        "memory": {"rss_mb": round(rss_mb), "peak_mb": round(peak_mb)},
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"✅ Sonuçlar kaydedildi: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(result, baseline, args.max_regression):
+            print(f"❌ Performans gerilemesi (> %{args.max_regression * 100:.0f})")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,157 @@
-from utils.waste_detector import WasteDetector
-import pickle
-from pathlib import Path
+from utils.embedding_engine import EmbeddingEngine
+from utils.waste_detector import WASTE_INFO
+from utils.feature_store import FeatureStore, file_fingerprint
+from utils.vector_index import INDEX_TYPES, ExactIndex, vote
+import numpy as np
+from utils.inference_backends import BACKBONES, BACKENDS, DEFAULT_BACKBONE
+import argparse
+import logging
+import time
 
-def build():
-    print("🚀 Feature extraction başlatılıyor...")
+def load_previous(engine):
+    """Mevcut store'dan path -> (vektör, kategori, parmak izi) haritası"""
+    store = engine.open_store()
+    if store is None:
+        return {}
+
+    fingerprints = store.extra.get('fingerprints', {})
+    return {
+        path: (store.vectors[i], store.categories[store.labels[i]], fingerprints.get(path))
+        for i, path in enumerate(store.paths)
+    }
+
+def without_self(result, i, top_k):
+    ids, scores = result
+    keep = ids != i
+    return ids[keep][:top_k], scores[keep][:top_k]
+
+def report_compression(engine, sample=500, top_k=20, seed=0):
+    """Sıkıştırılmış indeksin bellek kazancı ve exact aramaya göre oy uyumu"""
+    full_bytes = engine.feature_matrix.nbytes
+    index_bytes = engine.index.memory_bytes()
+    print(f"📦 İndeks belleği: {index_bytes / 1e6:.1f} MB "
+          f"(tam vektörler: {full_bytes / 1e6:.1f} MB, %{100 * (1 - index_bytes / full_bytes):.0f} tasarruf)")
     
-    # Detector'ı başlat (bu işlem dataset'i tarayacak)
-    detector = WasteDetector()
+    # Store'dan örneklenen vektörlerle, kendisi hariç komşuların oyu karşılaştırılır
+    matrix = np.asarray(engine.feature_matrix)
+    labels = [engine.label_names[i] for i in engine.label_ids]
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(matrix), min(sample, len(matrix)), replace=False)
     
-    if not detector.is_loaded():
+    exact = ExactIndex().build(matrix)
+    agree = 0
+    for i, a, b in zip(queries, exact.search_batch(matrix[queries], top_k + 1),
+                       engine.index.search_batch(matrix[queries], top_k + 1)):
+        exact_vote = vote(*without_self(a, i, top_k), labels)
+        index_vote = vote(*without_self(b, i, top_k), labels)
+        agree += exact_vote == index_vote
+    print(f"🎯 kNN oy uyumu (exact'e göre): {agree / len(queries):.3f} ({len(queries)} örnek)")
+
+def build(index_type="exact", max_per_category=None, full=False, batch_size=32, num_workers=None,
+          backend="torch", backend_path=None, backbone=DEFAULT_BACKBONE, index_params=None):
+    print("🚀 Feature extraction başlatılıyor...")
+    start = time.perf_counter()
+
+    # Sadece modeli yükle; dataset taraması burada artımlı yapılıyor
+    engine = EmbeddingEngine(index_type=index_type, index_params=index_params,
+                             max_per_category=max_per_category,
+                             batch_size=batch_size, num_workers=num_workers,
+                             backend=backend, backend_path=backend_path, backbone=backbone,
+                             known_categories=set(WASTE_INFO))
+
+    previous = {} if full else load_previous(engine)
+
+    features = {}
+    fingerprints = {}
+    pending = []
+    reused = extracted = failed = 0
+
+    for category, img_path in engine.list_dataset_images():
+        path = str(img_path)
+        old_vector, old_category, old_fingerprint = previous.get(path, (None, None, None))
+        fingerprint = file_fingerprint(img_path, old_fingerprint)
+
+        # İçerik ve kategori değişmemişse eski vektörü kullan
+        if old_fingerprint is not None and old_category == category and old_fingerprint[2] == fingerprint[2]:
+            features[path] = {'features': old_vector, 'category': category}
+            fingerprints[path] = fingerprint
+            reused += 1
+        else:
+            pending.append((path, category, fingerprint))
+
+    # Yeni/değişen görselleri tek seferde batch'ler halinde işle
+    vectors = engine.extract_features_batch([path for path, _, _ in pending])
+    for (path, category, fingerprint), vector in zip(pending, vectors):
+        if vector is None:
+            failed += 1
+            continue
+        features[path] = {'features': vector, 'category': category}
+        fingerprints[path] = fingerprint
+        extracted += 1
+
+    removed = len(set(previous) - set(features))
+
+    if not features:
         print("❌ Dataset yüklenemedi!")
         return
 
-    # Cache dosyasını kaydet
-    cache_path = Path("features.pkl")
-    
-    print(f"💾 Özellikler kaydediliyor: {cache_path}")
-    detector.save_features(str(cache_path))
+    store = FeatureStore.from_features(
+        features, engine.model_id, engine.PREPROCESSING,
+        extra={'fingerprints': fingerprints}
+    )
+    # İndeks her zaman yeni vektörlerden kurulur; eski dosya aynı sayıda
+    # vektör için kurulmuş olsa bile farklı görselleri gösterebilir
+    engine.use_store(store, rebuild_index=True)
+
+    # Feature store'u kaydet (geçici klasöre yazılıp yerine taşınır)
+    print(f"💾 Özellikler kaydediliyor: {engine.store_path}")
+    engine.save_features()
+    engine.save_index()
     
-    print("✅ İşlem tamamlandı! 'features.pkl' dosyası oluşturuldu.")
-    print("ℹ️  Bu dosyayı Render'a deploy etmeyi unutmayın!")
+    if index_type in ("pca", "pq"):
+        report_compression(engine)
+
+    elapsed = time.perf_counter() - start
+    print(f"📊 Yeniden kullanılan: {reused}, çıkarılan: {extracted}, "
+          f"silinen: {removed}, hatalı: {failed} ({elapsed:.1f} sn)")
+    print(f"✅ İşlem tamamlandı! '{engine.store_path}' klasörü oluşturuldu.")
+    print("ℹ️  Bu klasörü Render'a deploy etmeyi unutmayın!")
 
 if __name__ == "__main__":
-    build()
+    # Dedektörün ilerleme mesajları (kategori sayıları, yükleme) logging üzerinden gelir
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Dataset feature cache'ini ve arama indeksini oluştur")
+    parser.add_argument("--index", default="exact", choices=sorted(INDEX_TYPES),
+                        help="Arama indeksi tipi (pca/pq: sıkıştırılmış referans vektörleri)")
+    parser.add_argument("--pca-dim", type=int, default=None,
+                        help="pca: hedef boyut (varsayılan 256); pq: önce bu boyuta indir")
+    parser.add_argument("--pq-m", type=int, default=64,
+                        help="pq: alt uzay sayısı (vektör başına byte)")
+    parser.add_argument("--pq-nbits", type=int, default=8,
+                        help="pq: alt uzay başına kod biti (kod kitabı boyutu 2^nbits)")
+    parser.add_argument("--max-per-category", type=int, default=None,
+                        help="Kategori başına en fazla görsel (varsayılan: hepsi)")
+    parser.add_argument("--full", action="store_true",
+                        help="Mevcut store'u yok say, tüm görselleri yeniden işle")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="Model forward batch boyutu")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Decode/ön işleme worker sayısı (varsayılan: çekirdek sayısı, en fazla 8)")
+    parser.add_argument("--backend", default="torch", choices=sorted(BACKENDS),
+                        help="Feature extractor backend'i (int8 kendi store'una yazar: feature_store_int8)")
+    parser.add_argument("--backend-path", default=None,
+                        help="Export edilmiş model dosyası (varsayılan: models/<omurga>_features.*)")
+    parser.add_argument("--backbone", default=DEFAULT_BACKBONE, choices=list(BACKBONES),
+                        help="Feature extractor omurgası (varsayılan dışındakiler feature_store_<omurga>/ kullanır)")
+    args = parser.parse_args()
+
+    index_params = {}
+    if args.index == "pca" and args.pca_dim:
+        index_params = {'dim': args.pca_dim}
+    elif args.index == "pq":
+        index_params = {'m': args.pq_m, 'nbits': args.pq_nbits, 'pca_dim': args.pca_dim}
+    
+    build(index_type=args.index, max_per_category=args.max_per_category, full=args.full,
+          batch_size=args.batch_size, num_workers=args.workers,
+          backend=args.backend, backend_path=args.backend_path, backbone=args.backbone,
+          index_params=index_params)
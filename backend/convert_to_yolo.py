@@ -1,16 +1,30 @@
+"""
+dataset/<kategori>/ klasörlerini YOLO formatına çevirir (tüm görsel tek nesne).
+
+    - Kategoriler süreç havuzunda paralel işlenir
+    - Zaten RGB JPEG olan görseller yeniden kodlanmaz: hard link (olmazsa kopya)
+    - Çıktısı kaynaktan yeni olan görseller atlanır; tekrar çalıştırmak sadece
+      eklenen / değişen görselleri işler, silinenlerin çıktıları temizlenir
+    - data.yaml göreli yollarla yazılır (train_yolo.py mutlak yola çevirir)
+    - Train/val ayrımı tohuma ve dosya adına bağlıdır: aynı tohumla her çalıştırmada
+      aynı ayrım çıkar, yeni görsel eklemek mevcut görsellerin yerini değiştirmez
+
+Kullanım:
+    python convert_to_yolo.py                          # yolo_dataset/, %15 val
+    python convert_to_yolo.py --output data --val-split 0.2
+    python convert_to_yolo.py --seed 1 --workers 4 --force
+"""
+import argparse
+import hashlib
 import os
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import random
-from PIL import Image
 
-# Paths
-DATASET_DIR = Path("dataset")
-OUTPUT_DIR = Path("yolo_dataset")
-IMAGES_DIR = OUTPUT_DIR / "images"
-LABELS_DIR = OUTPUT_DIR / "labels"
+from PIL import Image
 
-# Kategoriler (klasör isimlerinize göre)
+# Sınıf id'leri eğitilmiş modellerle uyumlu kalmalı (sıra değiştirilmemeli)
 CATEGORIES = {
     'cardboard': 0,
     'glass': 1,
@@ -20,100 +34,174 @@ CATEGORIES = {
     'trash': 5
 }
 
-# Klasörleri oluştur
-for split in ['train', 'val']:
-    (IMAGES_DIR / split).mkdir(parents=True, exist_ok=True)
-    (LABELS_DIR / split).mkdir(parents=True, exist_ok=True)
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+SPLITS = ("train", "val")
+# Üretilen dosyalar; Ultralytics'in disk cache'i (.npy) budamada korunur
+OUTPUT_SUFFIXES = {".jpg", ".txt"}
+
+
+def assign_split(category, image_path, val_split, seed):
+    """Tohum + dosya adı hash'inden train/val (görsel eklemek diğerlerini etkilemez)"""
+    digest = hashlib.sha1(f"{seed}:{category}/{image_path.name}".encode()).digest()
+    fraction = int.from_bytes(digest[:8], "big") / 2 ** 64
+    return "val" if fraction < val_split else "train"
+
+
+def is_up_to_date(output, source):
+    return output.exists() and output.stat().st_mtime >= source.stat().st_mtime
+
+
+def write_image(source, target, quality):
+    """RGB JPEG'leri link'le / kopyala, diğerlerini JPEG'e kodla; 'linked', 'copied' veya 'encoded'"""
+    with Image.open(source) as img:
+        compliant = img.format == "JPEG" and img.mode == "RGB"
+        if not compliant:
+            img.convert('RGB').save(target, 'JPEG', quality=quality)
+            return "encoded"
 
-def convert_image(img_path, category_id, output_split):
-    """Görseli YOLO formatına çevir"""
     try:
-        img = Image.open(img_path)
-        img_width, img_height = img.size
-        
-        # Tüm görsel tek nesne (bounding box tüm görseli kaplar)
-        x_center = 0.5
-        y_center = 0.5
-        width = 1.0
-        height = 1.0
-        
-        # YOLO label formatı: class_id x_center y_center width height
-        label_content = f"{category_id} {x_center} {y_center} {width} {height}\n"
-        
-        # Dosya adı (benzersiz olması için kategori + stem)
-        filename = f"{img_path.parent.name}_{img_path.stem}"
-        
-        # Görseli JPEG olarak kaydet
-        img_output = IMAGES_DIR / output_split / f"{filename}.jpg"
-        img.convert('RGB').save(img_output, 'JPEG', quality=95)
-        
-        # Label dosyası (.txt)
-        label_output = LABELS_DIR / output_split / f"{filename}.txt"
-        with open(label_output, 'w') as f:
-            f.write(label_content)
-        
-        return True
-    except Exception as e:
-        print(f"  ❌ Hata: {img_path.name} - {e}")
-        return False
-
-def prepare_yolo_dataset(train_split=0.85):
+        os.link(source, target)
+        return "linked"
+    except OSError:
+        # Farklı disk / hard link desteklemeyen dosya sistemi
+        shutil.copy2(source, target)
+        return "copied"
+
+
+def convert_category(task):
+    """Süreç havuzunda çalışır: bir kategorinin görsellerini çevir, sayaçları döndür"""
+    category, class_id, image_paths, output_dir, val_split, seed, quality, force = task
+    output_dir = Path(output_dir)
+    counts = {"linked": 0, "copied": 0, "encoded": 0, "skipped": 0, "failed": 0,
+              "train": 0, "val": 0}
+    outputs = []
+    label_content = f"{class_id} 0.5 0.5 1.0 1.0\n"
+
+    for image_path in map(Path, image_paths):
+        split = assign_split(category, image_path, val_split, seed)
+        name = f"{category}_{image_path.stem}"
+        image_output = output_dir / "images" / split / f"{name}.jpg"
+        label_output = output_dir / "labels" / split / f"{name}.txt"
+        counts[split] += 1
+        outputs.extend([image_output, label_output])
+
+        if not force and is_up_to_date(image_output, image_path) and label_output.exists():
+            counts["skipped"] += 1
+            continue
+
+        try:
+            if image_output.exists():
+                image_output.unlink()
+            counts[write_image(image_path, image_output, quality)] += 1
+            label_output.write_text(label_content)
+        except Exception as e:
+            print(f"  ❌ Hata: {image_path.name} - {e}")
+            counts["failed"] += 1
+
+    return category, counts, [str(p) for p in outputs]
+
+
+def list_images(category_path):
+    return sorted(p for p in category_path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def remove_stale(output_dir, expected):
+    """Kaynağı silinmiş ya da split'i değişmiş görsellerin eski çıktılarını kaldır"""
+    removed = 0
+    for kind in ("images", "labels"):
+        for split in SPLITS:
+            for path in (output_dir / kind / split).iterdir():
+                if path.suffix in OUTPUT_SUFFIXES and str(path) not in expected:
+                    path.unlink()
+                    removed += 1
+    return removed
+
+
+def write_data_yaml(output_dir):
+    """Makineye bağlı mutlak yol içermeyen data.yaml (yollar bu klasöre göre)"""
+    names = sorted(CATEGORIES, key=CATEGORIES.get)
+    content = (
+        "# convert_to_yolo.py tarafından üretildi; yollar bu dosyanın klasörüne göredir\n"
+        "train: images/train\n"
+        "val: images/val\n"
+        "\n"
+        f"nc: {len(names)}\n"
+        f"names: {names}\n"
+    )
+    path = output_dir / "data.yaml"
+    path.write_text(content)
+    return path
+
+
+def prepare_yolo_dataset(dataset_dir="dataset", output_dir="yolo_dataset", val_split=0.15,
+                         seed=0, workers=None, quality=95, force=False):
     """Dataset'i YOLO formatına çevir"""
     print("🔄 YOLO dataset hazırlanıyor...\n")
-    
-    if not DATASET_DIR.exists():
-        print(f"❌ Dataset klasörü bulunamadı: {DATASET_DIR}")
-        return
-    
-    total = 0
-    success = 0
-    
+    dataset_dir = Path(dataset_dir)
+    output_dir = Path(output_dir)
+
+    if not dataset_dir.exists():
+        print(f"❌ Dataset klasörü bulunamadı: {dataset_dir}")
+        return None
+
+    for kind in ("images", "labels"):
+        for split in SPLITS:
+            (output_dir / kind / split).mkdir(parents=True, exist_ok=True)
+
+    tasks = []
     for category, class_id in CATEGORIES.items():
-        category_path = DATASET_DIR / category
-        
+        category_path = dataset_dir / category
         if not category_path.exists():
             print(f"⚠️ Kategori bulunamadı: {category}")
             continue
-        
-        # Görselleri bul
-        images = (list(category_path.glob("*.jpg")) + 
-                 list(category_path.glob("*.jpeg")) + 
-                 list(category_path.glob("*.png")))
-        
-        if len(images) == 0:
+
+        images = list_images(category_path)
+        if not images:
             print(f"⚠️ {category}: Görsel bulunamadı")
             continue
-        
-        random.shuffle(images)
-        
-        # Train/Val split (%85 train, %15 validation)
-        split_idx = int(len(images) * train_split)
-        train_imgs = images[:split_idx]
-        val_imgs = images[split_idx:]
-        
-        print(f"📂 {category} (class {class_id}): {len(images)} görsel")
-        print(f"   └─ Train: {len(train_imgs)}, Val: {len(val_imgs)}")
-        
-        # Train set
-        for img_path in train_imgs:
-            if convert_image(img_path, class_id, 'train'):
-                success += 1
-            total += 1
-        
-        # Val set
-        for img_path in val_imgs:
-            if convert_image(img_path, class_id, 'val'):
-                success += 1
-            total += 1
-        
-        print()
-    
-    print(f"✅ YOLO dataset hazır!")
-    print(f"📊 Toplam: {total} görsel işlendi")
-    print(f"✓ Başarılı: {success}")
-    print(f"✗ Hatalı: {total - success}")
-    print(f"\n📁 Konum: {OUTPUT_DIR.absolute()}")
-    print(f"\n📋 Sonraki adım: data.yaml dosyasını oluşturun")
+        tasks.append((category, class_id, [str(p) for p in images], str(output_dir),
+                      val_split, seed, quality, force))
+
+    start = time.perf_counter()
+    totals = {}
+    expected = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for category, counts, outputs in pool.map(convert_category, tasks):
+            print(f"📂 {category} (class {CATEGORIES[category]}): "
+                  f"Train: {counts['train']}, Val: {counts['val']}")
+            expected.update(outputs)
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+
+    removed = remove_stale(output_dir, expected)
+    data_yaml = write_data_yaml(output_dir)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n✅ YOLO dataset hazır! ({elapsed:.1f} sn)")
+    print(f"📊 Toplam: {totals.get('train', 0) + totals.get('val', 0)} görsel")
+    print(f"🔗 Link: {totals.get('linked', 0)}, Kopya: {totals.get('copied', 0)}, "
+          f"Yeniden kodlanan: {totals.get('encoded', 0)}")
+    print(f"⏭️  Güncel (atlanan): {totals.get('skipped', 0)}, Silinen eski çıktı: {removed}")
+    print(f"✗ Hatalı: {totals.get('failed', 0)}")
+    print(f"\n📁 Konum: {output_dir.absolute()}")
+    print(f"📋 Eğitim: python train_yolo.py --data {data_yaml}")
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dataset/ klasörünü YOLO formatına çevir")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--output", default="yolo_dataset")
+    parser.add_argument("--val-split", type=float, default=0.15, help="Validation oranı")
+    parser.add_argument("--seed", type=int, default=0, help="Train/val ayrımı tohumu")
+    parser.add_argument("--workers", type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument("--quality", type=int, default=95, help="Yeniden kodlanan görseller için JPEG kalitesi")
+    parser.add_argument("--force", action="store_true", help="Güncel çıktıları da yeniden üret")
+    args = parser.parse_args(argv)
+
+    prepare_yolo_dataset(args.dataset, args.output, args.val_split, args.seed,
+                         args.workers, args.quality, args.force)
+
 
 if __name__ == "__main__":
-    prepare_yolo_dataset()
\ No newline at end of file
+    main()
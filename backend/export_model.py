@@ -0,0 +1,192 @@
+"""
+Feature extractor omurgasını (varsayılan ResNet50, son katmanı çıkarılmış)
+ONNX ve TorchScript olarak export eder, ardından export edilen grafiklerin embedding'lerini
+eager PyTorch modeliyle dataset görselleri üzerinde karşılaştırır.
+
+int8 formatı statik post-training quantization uygular (FX graph mode):
+aktivasyon aralıkları dataset görselleriyle kalibre edilir. Quantize model
+float modelden biraz farklı embedding ürettiği için kendi feature store'unu
+kullanır (build_features.py --backend int8 -> feature_store_int8/).
+
+Kullanım:
+    python export_model.py                      # models/resnet50_features.{onnx,ts}
+    python export_model.py --backbone resnet18  # models/resnet18_features.{onnx,ts}
+    python export_model.py --format onnx --verify-images 32
+    python export_model.py --format int8 --calibration-images 256
+    ECOSCAN_BACKEND=onnx python main.py         # export edilen grafikle servis et
+
+Doğrulama başarısız olursa (max fark > --atol veya cosine < --min-cosine;
+int8 için sadece cosine < --int8-min-cosine) çıkış kodu 1 olur;
+CI/deploy adımında kullanılabilir.
+"""
+import argparse
+import copy
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from utils.embedding_engine import EmbeddingEngine
+from utils.inference_backends import (
+    BACKBONES, DEFAULT_BACKBONE, EXPORT_SUFFIXES, TorchBackend, build_backbone,
+    create_backend, default_export_path, quantized_engine
+)
+from utils.waste_detector import WasteDetector
+
+
+def export_torchscript(model, path):
+    example = torch.zeros(1, 3, *WasteDetector.PREPROCESSING['resize'])
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, example)
+    traced = torch.jit.freeze(traced.eval())
+    traced.save(str(path))
+
+
+def export_onnx(model, path, opset=17):
+    example = torch.zeros(1, 3, *WasteDetector.PREPROCESSING['resize'])
+    with torch.no_grad():
+        torch.onnx.export(
+            model, example, str(path),
+            input_names=["input"],
+            output_names=["features"],
+            dynamic_axes={"input": {0: "batch"}, "features": {0: "batch"}},
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+
+
+def export_int8(model, path, calibration_batches):
+    """Statik PTQ: conv+bn+relu birleştirilir, gözlemciler kalibrasyon batch'leriyle beslenir"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = quantized_engine()
+    torch.backends.quantized.engine = engine
+
+    # Float modeli bozmamak için kopyası üzerinde çalış
+    float_model = copy.deepcopy(model).eval()
+    example = torch.zeros(1, 3, *WasteDetector.PREPROCESSING['resize'])
+    prepared = prepare_fx(float_model, get_default_qconfig_mapping(engine), (example,))
+
+    with torch.inference_mode():
+        for batch in calibration_batches:
+            prepared(torch.as_tensor(batch))
+
+    quantized = convert_fx(prepared)
+    with torch.inference_mode():
+        traced = torch.jit.trace(quantized, example)
+    traced = torch.jit.freeze(traced.eval())
+    traced.save(str(path))
+    print(f"   ⚙️  Quantized motor: {engine}")
+
+
+def sample_images(dataset_path, count):
+    """Her kategoriden sırayla seçilen en fazla `count` görsel"""
+    dataset_path = Path(dataset_path)
+    if not dataset_path.exists():
+        return []
+
+    by_category = [
+        sorted(p for p in folder.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        for folder in sorted(dataset_path.iterdir()) if folder.is_dir()
+    ]
+
+    selected = []
+    while len(selected) < count and any(by_category):
+        for paths in by_category:
+            if paths and len(selected) < count:
+                selected.append(paths.pop(0))
+    return selected
+
+
+def load_batch(paths):
+    if not paths:
+        # Dataset yoksa rastgele girdiyle doğrula
+        rng = np.random.default_rng(0)
+        return rng.standard_normal((4, 3, *WasteDetector.PREPROCESSING['resize'])).astype(np.float32)
+    # int8 kalibrasyonu servisteki girdiyle (JPEG draft decode + EXIF) yapılır
+    return EmbeddingEngine.preprocess_files(paths)
+
+
+def calibration_batches(paths, batch_size=16):
+    for start in range(0, max(len(paths), 1), batch_size):
+        yield load_batch(paths[start:start + batch_size])
+
+
+def verify(reference, candidate, atol, min_cosine):
+    """Embedding farklarını raporla; tolerans içindeyse True (atol=None: sadece cosine)"""
+    max_diff = float(np.abs(reference - candidate).max())
+    ref_norm = np.linalg.norm(reference, axis=1)
+    cand_norm = np.linalg.norm(candidate, axis=1)
+    cosine = np.sum(reference * candidate, axis=1) / np.maximum(ref_norm * cand_norm, 1e-12)
+    ok = (atol is None or max_diff <= atol) and float(cosine.min()) >= min_cosine
+    print(f"   max |fark|: {max_diff:.2e}  min cosine: {float(cosine.min()):.6f}  "
+          f"{'✅' if ok else '❌'}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature extractor'ı ONNX/TorchScript olarak export et")
+    parser.add_argument("--format", nargs="+", default=["onnx", "torchscript"],
+                        choices=sorted(EXPORT_SUFFIXES), help="Export formatları")
+    parser.add_argument("--backbone", default=DEFAULT_BACKBONE, choices=list(BACKBONES),
+                        help="Export edilecek omurga")
+    parser.add_argument("--output-dir", default=None,
+                        help="Çıktı klasörü (varsayılan: models/)")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset sürümü")
+    parser.add_argument("--dataset", default="dataset", help="Doğrulama görselleri için dataset klasörü")
+    parser.add_argument("--verify-images", type=int, default=16,
+                        help="Doğrulamada kullanılacak görsel sayısı (0 = doğrulama yok)")
+    parser.add_argument("--atol", type=float, default=1e-3,
+                        help="Embedding elemanları arasında izin verilen en büyük mutlak fark")
+    parser.add_argument("--min-cosine", type=float, default=0.9999,
+                        help="Eager ve export embedding'leri arasında en düşük cosine benzerliği")
+    parser.add_argument("--calibration-images", type=int, default=256,
+                        help="int8 kalibrasyonunda kullanılacak görsel sayısı")
+    parser.add_argument("--int8-min-cosine", type=float, default=0.98,
+                        help="int8 embedding'leri için en düşük cosine benzerliği")
+    args = parser.parse_args()
+
+    print(f"🔄 {args.backbone} modeli yükleniyor...")
+    model = build_backbone(args.backbone)
+
+    outputs = {}
+    for fmt in args.format:
+        path = default_export_path(fmt, args.backbone)
+        if args.output_dir:
+            path = Path(args.output_dir) / path.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        print(f"📦 {fmt} export ediliyor: {path}")
+        if fmt == "onnx":
+            export_onnx(model, path, opset=args.opset)
+        elif fmt == "int8":
+            calibration = sample_images(args.dataset, args.calibration_images)
+            print(f"   🎯 {len(calibration)} görsel ile kalibre ediliyor...")
+            export_int8(model, path, calibration_batches(calibration))
+        else:
+            export_torchscript(model, path)
+        print(f"   📏 Boyut: {path.stat().st_size / 1e6:.1f} MB")
+        outputs[fmt] = path
+
+    if args.verify_images <= 0:
+        sys.exit(0)
+
+    batch = load_batch(sample_images(args.dataset, args.verify_images))
+    print(f"🔍 {len(batch)} görsel ile eager model karşılaştırılıyor...")
+    reference = TorchBackend(model)(batch)
+
+    ok = True
+    for fmt, path in outputs.items():
+        print(f"  {fmt}:")
+        if fmt == "int8":
+            tolerance = (None, args.int8_min_cosine)
+        else:
+            tolerance = (args.atol, args.min_cosine)
+        ok = verify(reference, create_backend(fmt, path, args.backbone)(batch), *tolerance) and ok
+
+    if not ok:
+        print("❌ Export edilen model eager modelle uyuşmuyor!")
+        sys.exit(1)
+    print("✅ Export tamamlandı ve doğrulandı.")
@@ -0,0 +1,37 @@
+"""
+Çok worker'lı pre-fork servis ayarları.
+
+Model, feature store ve arama indeksi ana süreçte bir kez yüklenir (main.preload);
+uvicorn worker'ları fork ile bu belleği copy-on-write paylaşır. Feature matrisi
+zaten memmap olduğu için tüm worker'lar aynı page cache sayfalarını okur;
+worker başına ek bellek sadece Python nesneleri, sonuç önbelleği ve forward
+pass aktivasyonlarıdır. Böylece bellek worker sayısıyla doğrusal büyümez.
+
+Kullanım:
+    gunicorn main:app -c gunicorn.conf.py
+    WEB_CONCURRENCY=4 gunicorn main:app -c gunicorn.conf.py
+
+Tek worker için Procfile'daki uvicorn komutu yeterlidir (model arka planda yüklenir).
+"""
+import multiprocessing
+import os
+
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Uygulama (ve main.preload ile model) worker'lar fork edilmeden önce yüklenir
+preload_app = True
+# Worker'lar ilk istekten önce forward pass ile ısınır
+timeout = 120
+
+# Çekirdekleri worker'lar arasında paylaştır (her worker tüm çekirdekleri kullanırsa
+# forward pass'ler birbirini yavaşlatır); main.py ECOSCAN_THREADS'i backend'e iletir
+os.environ.setdefault("ECOSCAN_THREADS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+
+def on_starting(server):
+    """Ana süreç: worker'lar fork edilmeden önce modeli yükle"""
+    import main
+
+    main.preload()
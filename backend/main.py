@@ -1,12 +1,49 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import shutil
-import os
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.formparsers import MultiPartParser
+from contextlib import asynccontextmanager
+from typing import List
 from pathlib import Path
-from utils.waste_detector import WasteDetector
+import io
+import gc
+import logging
+import os
+import threading
+import time
+import zipfile
+import zlib
+from utils.batcher import MicroBatcher
+from utils.image_decode import RAW_CONTENT_TYPE, RawRGB
+from utils.metrics import BATCH_SIZE, HTTP_REQUESTS, HTTP_SECONDS, STAGE_SECONDS, render_samples
+from utils.result_cache import ResultCache
+from utils.waste_info import waste_types
+
+# ECOSCAN_LOG_LEVEL=DEBUG: istek başına satırlar (gelen dosya, sonuç, top-5 benzerler)
+logging.basicConfig(
+    level=os.environ.get("ECOSCAN_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger("ecoscan")
+
+# Model (torch + ağırlıklar + feature store) arka planda yüklenir; port hemen
+# açılır ve /health hazır olma durumunu bildirir:
+#   loading  -> model yükleniyor
+#   ready    -> istekler kabul ediliyor
+#   degraded -> yükleme başarısız ya da dataset boş (bkz. "error")
+detector = None
+batcher = None
+model_state = {"status": "loading", "error": None, "load_seconds": None}
+STARTED_AT = time.monotonic()
 
-app = FastAPI(title="EcoScan API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app):
+    threading.Thread(target=load_model, name="model-loader", daemon=True).start()
+    yield
+    if batcher is not None:
+        batcher.stop()
+
+app = FastAPI(title="EcoScan API", version="1.0.0", lifespan=lifespan)
 
 # CORS ayarları (Flutter'dan erişim için)
 app.add_middleware(
@@ -17,12 +54,128 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Upload klasörü
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Endpoint başına istek sayısı ve süresi (/metrics)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Eşleşmeyen yollar tek etikette toplanır (etiket sayısı sınırlı kalsın)
+    endpoint = getattr(request.scope.get("endpoint"), "__name__", "other")
+    HTTP_SECONDS.observe(time.perf_counter() - start, endpoint)
+    HTTP_REQUESTS.inc(endpoint, str(response.status_code))
+    return response
+
+ALLOWED_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/webp", "image/heic"]
+ZIP_TYPES = ["application/zip", "application/x-zip-compressed"]
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic"}
+
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024
+MAX_BATCH_FILES = int(os.environ.get("ECOSCAN_MAX_BATCH_FILES", "32"))
+# Bir zip'ten açılan görsellerin toplam (sıkıştırılmamış) boyutu
+MAX_ZIP_BYTES = int(os.environ.get("ECOSCAN_MAX_ZIP_BYTES", str(128 * 1024 * 1024)))
+# Prototip hızlı yolu varsayılan olarak kapalı: bir eşik seçmeden önce güncel store'da
+# "python benchmark_index.py --margins 0.02 0.05 0.1" ile oy uyumunu kontrol edin
+FAST_PATH_MARGIN = os.environ.get("ECOSCAN_FAST_MARGIN", "off")
+FAST_PATH_TEMPERATURE = float(os.environ.get("ECOSCAN_FAST_TEMPERATURE", "0.02"))
+
+# ECOSCAN_YOLO_CLASSES: "biodegradable:trash,clothes:textile" biçiminde sınıf eşlemesi
+YOLO_CLASS_MAP = dict(
+    pair.split(":", 1) for pair in os.environ.get("ECOSCAN_YOLO_CLASSES", "").split(",") if ":" in pair
+)
+
+# Upload'lar bu boyuta kadar geçici dosyaya taşmadan bellekte tutulur
+# (Starlette varsayılanı 1 MB; telefon fotoğrafları genelde 3-6 MB).
+# Bu sadece taşma eşiği; boyut sınırı read_upload'da uygulanır (413)
+MultiPartParser.max_file_size = MAX_UPLOAD_BYTES
+
+def create_detector(threads=None):
+    """
+    Model yükle (ECOSCAN_INDEX: "exact", "ivf", "pca" veya "pq";
+    ECOSCAN_BACKEND: "torch", "torchscript", "onnx" veya "int8", bkz. export_model.py;
+    ECOSCAN_BACKBONE: "resnet50", "resnet18", "mobilenet_v3_large", "efficientnet_b0", ...)
+    """
+    threads = threads or int(os.environ.get("ECOSCAN_THREADS", "0")) or None
+    # torch / onnxruntime / ultralytics importu burada, yükleme thread'inde yapılır
+    from utils.waste_detector import WasteDetector
+    
+    return WasteDetector(
+        model_path=os.environ.get("ECOSCAN_YOLO_MODEL", "models/best.pt"),
+        index_type=os.environ.get("ECOSCAN_INDEX", "exact"),
+        backend=os.environ.get("ECOSCAN_BACKEND", "torch"),
+        backend_path=os.environ.get("ECOSCAN_BACKEND_PATH") or None,
+        backbone=os.environ.get("ECOSCAN_BACKBONE", "resnet50"),
+        # Prototip skorlarında ilk iki kategori farkı bu eşiği geçerse kNN atlanır ("off" = kapalı)
+        fast_path_margin=None if FAST_PATH_MARGIN == "off" else float(FAST_PATH_MARGIN),
+        # Hızlı yol güveninin softmax sıcaklığı (bkz. WasteDetector.fast_path_temperature)
+        fast_path_temperature=FAST_PATH_TEMPERATURE,
+        prototypes_per_class=int(os.environ.get("ECOSCAN_PROTOTYPES", "1")),
+        # ECOSCAN_ENGINE=yolo: ResNet+kNN yerine models/best.pt ile tek geçişte tespit;
+        # ECOSCAN_ENGINE=head: kNN oylaması yerine train_head.py başlığı (matmul + softmax)
+        engine=os.environ.get("ECOSCAN_ENGINE", "knn"),
+        head_path=os.environ.get("ECOSCAN_HEAD_PATH") or None,
+        yolo_imgsz=int(os.environ.get("ECOSCAN_YOLO_IMGSZ", "640")),
+        yolo_conf=float(os.environ.get("ECOSCAN_YOLO_CONF", "0.25")),
+        yolo_class_map=YOLO_CLASS_MAP,
+        threads=threads,
+        result_cache=ResultCache(
+            max_bytes=int(float(os.environ.get("ECOSCAN_CACHE_MB", "32")) * 1024 * 1024),
+            ttl_seconds=float(os.environ.get("ECOSCAN_CACHE_TTL", "3600")),
+            use_phash=os.environ.get("ECOSCAN_CACHE_PHASH", "0") == "1",
+        ),
+    )
+
+def preload():
+    """
+    Pre-fork servis (bkz. gunicorn.conf.py): model, feature store ve indeks ana
+    süreçte bir kez yüklenir; fork edilen worker'lar bu belleği copy-on-write
+    paylaşır. Forward pass ve thread'ler (batcher) fork'tan sonra, her worker'ın
+    lifespan'inde başlar.
+    """
+    global detector
+    
+    # ONNX Runtime'ın thread havuzu fork'u atlatamaz; tek thread'li oturum güvenli
+    threads = 1 if os.environ.get("ECOSCAN_BACKEND") == "onnx" else None
+    detector = create_detector(threads)
+    
+    # Yüklenen nesneleri GC taramasından çıkar; worker'larda sayfaları kopyalatmasın
+    gc.collect()
+    gc.freeze()
+
+def load_model():
+    """Detector'ı kur (pre-fork'ta zaten yüklü), ısıt ve batcher'ı başlat; sonucu model_state'e yaz"""
+    global detector, batcher
+    
+    try:
+        if detector is None:
+            detector = create_detector()
+        detector.warm_up()
+        
+        # Eşzamanlı istekleri tek forward pass'te toplayan inference thread'i
+        batcher = MicroBatcher(
+            detector.detect_batch,
+            max_batch_size=int(os.environ.get("ECOSCAN_MAX_BATCH", "8")),
+            max_wait_ms=float(os.environ.get("ECOSCAN_MAX_WAIT_MS", "10")),
+        )
+        
+        if detector.is_loaded():
+            model_state["status"] = "ready"
+        else:
+            model_state.update(status="degraded", error="Dataset yüklü değil")
+    except Exception as e:
+        logger.exception(f"🔥 Model yüklenemedi: {e}")
+        model_state.update(status="degraded", error=str(e))
+    
+    model_state["load_seconds"] = round(time.monotonic() - STARTED_AT, 2)
+    logger.info(f"🏁 Model durumu: {model_state['status']} ({model_state['load_seconds']} sn)")
 
-# Model yükle
-detector = WasteDetector(model_path="models/best.pt")
+def require_model():
+    """Model henüz yüklenmediyse (ya da yüklenemediyse) 503 döndür"""
+    if batcher is None:
+        if model_state["status"] == "loading":
+            detail = "Model yükleniyor, lütfen birkaç saniye sonra tekrar deneyin"
+        else:
+            detail = f"Model yüklenemedi: {model_state['error']}"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
 
 @app.get("/")
 async def root():
@@ -34,80 +187,303 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "model_loaded": detector.is_loaded()
+    """
+    Hazır olma kontrolü: "ready" ise 200, "loading" / "degraded" ise 503
+    (load balancer / Render trafiği model yüklenene kadar yönlendirmez)
+    """
+    health = {
+        "status": model_state["status"],
+        "model_loaded": detector is not None and detector.is_loaded(),
+        "uptime_seconds": round(time.monotonic() - STARTED_AT, 1),
+        "load_seconds": model_state["load_seconds"]
+    }
+    if model_state["error"]:
+        health["error"] = model_state["error"]
+    if detector is not None:
+        health["cache"] = detector.result_cache.stats()
+        health["classifier"] = detector.classifier_stats()
+    
+    status_code = 200 if model_state["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=health)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metin formatında aşama süreleri, kuyruk, önbellek ve sınıflandırıcı sayaçları"""
+    sections = [
+        STAGE_SECONDS.render(),
+        BATCH_SIZE.render(),
+        HTTP_SECONDS.render(),
+        HTTP_REQUESTS.render(),
+        render_samples("ecoscan_model_ready", "Model yüklü ve istek kabul ediyor (1/0)", "gauge",
+                       [({}, int(model_state["status"] == "ready"))]),
+    ]
+    if batcher is not None:
+        sections.append(render_samples("ecoscan_queue_depth", "Inference kuyruğunda bekleyen istek",
+                                       "gauge", [({}, batcher.qsize())]))
+    if detector is not None:
+        cache = detector.result_cache.stats()
+        sections.append(render_samples("ecoscan_cache_entries", "Sonuç önbelleğindeki kayıt", "gauge",
+                                       [({}, cache["entries"])]))
+        sections.append(render_samples("ecoscan_cache_bytes", "Sonuç önbelleğinin boyutu", "gauge",
+                                       [({}, cache["bytes"])]))
+        sections.append(render_samples(
+            "ecoscan_cache_events_total", "Önbellek olayları", "counter",
+            [({"event": event}, cache[event])
+             for event in ("hits", "phash_hits", "misses", "evictions", "expirations")]
+        ))
+        classifier = detector.classifier_stats()
+        sections.append(render_samples(
+            "ecoscan_answers_total", "Cevabı üreten yol (centroid / knn / head / yolo)", "counter",
+            [({"path": path}, classifier[path]) for path in ("centroid", "knn", "head", "yolo")]
+        ))
+    return PlainTextResponse("\n".join(sections) + "\n", media_type="text/plain; version=0.0.4")
+
+def serialize_result(result):
+    """Detector sonucunu JSON serializable hale getir (numpy float32 -> Python float)"""
+    if not result["success"]:
+        return {
+            "success": False,
+            "error": str(result["error"])
+        }
+    
+    serialized = {
+        "success": True,
+        "waste_type": str(result["waste_type"]),
+        "confidence": float(result["confidence"]),  # numpy.float32 → float
+        "bin_type": str(result["bin_type"]),
+        "bin_color": str(result["bin_color"]),
+        "recyclable": bool(result["recyclable"]),  # numpy.bool → bool
+        "points": int(result["points"]),  # numpy.int → int
+        "name_tr": str(result.get("name_tr", "Bilinmeyen")),
+        "icon": str(result.get("icon", "♻️")),
+        "path": str(result.get("path", "knn"))  # "centroid" (hızlı yol), "knn", "head" veya "yolo"
     }
+    
+    # YOLO: görseldeki tüm nesneler (en güvenli olan yukarıdaki ana sonuç)
+    if "objects" in result:
+        serialized["objects"] = [
+            {
+                "waste_type": str(obj["waste_type"]),
+                "confidence": float(obj["confidence"]),
+                "box": [float(v) for v in obj["box"]] if obj["box"] is not None else None,
+                "bin_type": str(obj["bin_type"]),
+                "bin_color": str(obj["bin_color"]),
+                "recyclable": bool(obj["recyclable"]),
+                "points": int(obj["points"]),
+                "name_tr": str(obj["name_tr"]),
+                "icon": str(obj["icon"])
+            }
+            for obj in result["objects"]
+        ]
+    
+    return serialized
+
+async def read_upload(file, limit=MAX_UPLOAD_BYTES):
+    """Upload'u belleğe oku; limit'ten büyükse 413 (boyut parser'dan biliniyorsa okumadan)"""
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Dosya çok büyük: {file.filename} (en fazla {limit // (1024 * 1024)} MB)"
+    )
+    if file.size is not None and file.size > limit:
+        raise too_large
+    with STAGE_SECONDS.time("upload_read"):
+        contents = await file.read()
+    if len(contents) > limit:
+        raise too_large
+    return contents
+
+def raw_pixels(contents):
+    """
+    Ham RGB upload'u (bkz. /api/config); boyutu modelin girdi boyutuyla aynı olmalı.
+    Reddedilirse 415 döner (analiz sonuçlarının 400'ünden ayrı): istemci önbelleğindeki
+    girdi ayarı eskimiştir, görseli dosya olarak yeniden gönderebilir.
+    """
+    require_model()
+    raw = detector.input_spec()["raw"]
+    if raw is None:
+        raise HTTPException(status_code=415, detail="Bu model ham piksel girdisi kabul etmiyor")
+    if len(contents) != raw["bytes"]:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Ham girdi {raw['width']}x{raw['height']}x3 uint8 RGB olmalı "
+                   f"({raw['bytes']} byte), {len(contents)} byte geldi"
+        )
+    return RawRGB(contents, raw["width"], raw["height"])
+
+def read_zip_images(contents, max_files=MAX_BATCH_FILES):
+    """
+    Zip içindeki görselleri arşivdeki sırayla (ad, bytes) olarak döndür.
+    Sınırlar açmadan önce merkezi dizindeki boyutlarla kontrol edilir (zipfile
+    bir girdiden bildirilen boyuttan fazlasını açmaz); küçük bir zip binlerce
+    girdi ya da çok büyük içerikle belleği dolduramaz.
+    """
+    images = []
+    total_bytes = 0
+    with zipfile.ZipFile(io.BytesIO(contents)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or Path(info.filename).suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            if len(images) >= max_files:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"En fazla {MAX_BATCH_FILES} görsel gönderilebilir (zip: {info.filename})"
+                )
+            if info.file_size > MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Zip içindeki dosya çok büyük: {info.filename}"
+                )
+            total_bytes += info.file_size
+            if total_bytes > MAX_ZIP_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Zip içeriği çok büyük (en fazla {MAX_ZIP_BYTES // (1024 * 1024)} MB)"
+                )
+            try:
+                images.append((info.filename, archive.read(info)))
+            except (RuntimeError, NotImplementedError, EOFError, zlib.error) as e:
+                # Şifreli girdi, desteklenmeyen sıkıştırma yöntemi ya da bozuk veri: istemci hatası
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Zip içindeki dosya okunamadı: {info.filename} ({e})"
+                )
+    return images
 
 @app.post("/api/analyze")
 async def analyze_waste(file: UploadFile = File(...)):
     """
     Atık görselini analiz eder
     """
-    print(f"📥 Gelen dosya: {file.filename}, Content-Type: {file.content_type}")
-    
-    allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/webp", "image/heic"]
+    logger.debug("📥 Gelen dosya: %s, Content-Type: %s", file.filename, file.content_type)
     
-    if file.content_type not in allowed_types:
-        print(f"❌ Geçersiz dosya tipi: {file.content_type}")
+    if file.content_type not in ALLOWED_TYPES and file.content_type != RAW_CONTENT_TYPE:
+        logger.info(f"❌ Geçersiz dosya tipi: {file.content_type}")
         raise HTTPException(
             status_code=400, 
             detail=f"Geçersiz dosya tipi: {file.content_type}"
         )
     
-    file_path = UPLOAD_DIR / f"temp_{file.filename}"
+    require_model()
+    
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Upload bellekte okunur, diske yazılmadan doğrudan decode edilir
+        contents = await read_upload(file)
         
-        print(f"💾 Dosya kaydedildi: {file_path}")
+        logger.debug("📦 Dosya okundu: %d byte", len(contents))
         
-        # Model ile analiz yap
-        result = detector.detect(str(file_path))
+        # Ham pikseller decode / resize adımlarını atlar
+        if file.content_type == RAW_CONTENT_TYPE:
+            contents = raw_pixels(contents)
         
-        print(f"🔍 Analiz sonucu: {result}")
+        # Model ile analiz yap (inference thread'inde, event loop'u bloklamadan)
+        result = await batcher.run(contents)
         
-        # Geçici dosyayı sil
-        os.remove(file_path)
+        logger.debug("🔍 Analiz sonucu: %s", result)
         
         if result["success"]:
-            # JSON serializable hale getir (numpy float32 -> Python float)
-            return JSONResponse(content={
-                "success": True,
-                "waste_type": str(result["waste_type"]),
-                "confidence": float(result["confidence"]),  # numpy.float32 → float
-                "bin_type": str(result["bin_type"]),
-                "bin_color": str(result["bin_color"]),
-                "recyclable": bool(result["recyclable"]),  # numpy.bool → bool
-                "points": int(result["points"]),  # numpy.int → int
-                "name_tr": str(result.get("name_tr", "Bilinmeyen")),
-                "icon": str(result.get("icon", "♻️"))
-            })
+            return JSONResponse(content=serialize_result(result))
         else:
-            print(f"❌ Analiz hatası: {result.get('error')}")
+            logger.info(f"❌ Analiz hatası: {result.get('error')}")
             return JSONResponse(
                 status_code=400,
-                content={
-                    "success": False,
-                    "error": str(result["error"])
-                }
+                content=serialize_result(result)
             )
             
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"🔥 Exception: {e}")  # Detaylı hata mesajı
+        raise HTTPException(status_code=500, detail=f"Analiz hatası: {str(e)}")
+
+@app.post("/api/analyze/batch")
+async def analyze_waste_batch(files: List[UploadFile] = File(...)):
+    """
+    Birden çok atık görselini tek forward pass'te analiz eder.
+    Görseller ayrı ayrı ya da tek bir zip dosyası içinde gönderilebilir;
+    sonuçlar gönderim sırasıyla döner.
+    """
+    # Parçalar okunmadan önce sayı kontrol edilir (zip içerikleri read_zip_images'ta sayılır)
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"En fazla {MAX_BATCH_FILES} görsel gönderilebilir ({len(files)} dosya geldi)"
+        )
+    
+    images = []
+    
+    for file in files:
+        is_zip = file.content_type in ZIP_TYPES or (file.filename or "").lower().endswith(".zip")
+        # Zip'in kendisi toplam içerik sınırına, tek görseller MAX_UPLOAD_BYTES'a tabi
+        contents = await read_upload(file, MAX_ZIP_BYTES if is_zip else MAX_UPLOAD_BYTES)
+        
+        if is_zip:
+            try:
+                images.extend(read_zip_images(contents, MAX_BATCH_FILES - len(images)))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Geçersiz zip dosyası: {file.filename}")
+        elif file.content_type in ALLOWED_TYPES:
+            images.append((file.filename, contents))
+        elif file.content_type == RAW_CONTENT_TYPE:
+            images.append((file.filename, raw_pixels(contents)))
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Geçersiz dosya tipi: {file.filename} ({file.content_type})"
+            )
+    
+    if not images:
+        raise HTTPException(status_code=400, detail="Analiz edilecek görsel bulunamadı")
+    
+    if len(images) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"En fazla {MAX_BATCH_FILES} görsel gönderilebilir ({len(images)} geldi)"
+        )
+    
+    require_model()
+    
+    logger.debug("📥 Batch analiz: %d görsel", len(images))
+    
+    try:
+        # Tüm görseller tek grup olarak tek forward pass + tek matris top-k aramasında işlenir
+        results = await batcher.run_many([contents for _, contents in images])
     except Exception as e:
-        if file_path.exists():
-            os.remove(file_path)
-        print(f"🔥 Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()  # Detaylı hata mesajı
+        logger.exception(f"🔥 Exception: {e}")
         raise HTTPException(status_code=500, detail=f"Analiz hatası: {str(e)}")
+    
+    return {
+        "success": True,
+        "count": len(results),
+        "results": [
+            {"filename": filename, **serialize_result(result)}
+            for (filename, _), result in zip(images, results)
+        ]
+    }
+
+@app.get("/api/config")
+async def get_config():
+    """
+    İstemcinin upload'u hazırlaması için: modelin girdi boyutu (bu boyuta küçültülmüş
+    görsel yeterli), ham RGB piksel formatı ve kabul edilen içerik tipleri
+    """
+    require_model()
+    input_spec = detector.input_spec()
+    return {
+        "engine": detector.engine,
+        "input": input_spec,
+        "accepted_types": ALLOWED_TYPES + ([RAW_CONTENT_TYPE] if input_spec["raw"] else []),
+        "max_upload_bytes": MAX_UPLOAD_BYTES,
+        "max_zip_bytes": MAX_ZIP_BYTES,
+        "max_batch_files": MAX_BATCH_FILES
+    }
 
 @app.get("/api/waste-types")
 async def get_waste_types():
     """
-    Desteklenen atık türlerini döndürür
+    Desteklenen atık türlerini döndürür (statik liste; model yüklenirken de cevap verir)
     """
     return {
-        "waste_types": detector.get_waste_types()
+        "waste_types": waste_types()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,179 @@
+"""
+Feature store'daki donmuş omurga embedding'leri üzerinde sınıflandırma başlığı eğitir
+(doğrusal ya da tek gizli katmanlı MLP). Dataset görüntü seviyesinde etiketli olduğu
+için kNN oylaması yerine tek matris çarpımı + softmax ile servis edilebilir:
+
+    - eğitim: sabit tohumla kategori bazında ayrılan train kısmında, tam batch AdamW
+    - kalibrasyon: validation setinde sıcaklık (temperature scaling) ayarlanır,
+      böylece cevaptaki confidence gerçek doğruluk oranına yakın olur
+    - rapor: validation doğruluğu, NLL ve ECE; aynı ayrımda top-20 kNN oylaması
+
+Başlık models/<omurga>_head.npz olarak kaydedilir (store klasörü build_features.py ile
+baştan yazıldığından içine konmaz); servis için:
+    python build_features.py
+    python train_head.py                     # doğrusal başlık
+    python train_head.py --hidden 256        # MLP
+    ECOSCAN_ENGINE=head python main.py
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from utils.feature_store import FeatureStore
+from utils.inference_backends import BACKBONES, BACKENDS, DEFAULT_BACKBONE
+from utils.linear_head import LinearHead
+from utils.vector_index import ExactIndex, normalize_rows, vote
+from utils.waste_detector import WasteDetector
+
+
+def stratified_split(labels, val_fraction, seed):
+    """Her kategoriden aynı oranda validation örneği ayır"""
+    rng = np.random.default_rng(seed)
+    train, val = [], []
+    for category in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == category))
+        n_val = int(round(len(members) * val_fraction)) if len(members) > 1 else 0
+        val.extend(members[:n_val])
+        train.extend(members[n_val:])
+    return np.sort(train), np.sort(val)
+
+
+def build_model(dim, n_classes, hidden):
+    if hidden:
+        return torch.nn.Sequential(
+            torch.nn.Linear(dim, hidden), torch.nn.ReLU(), torch.nn.Linear(hidden, n_classes)
+        )
+    return torch.nn.Linear(dim, n_classes)
+
+
+def train(model, x, y, epochs, lr, weight_decay, class_weights):
+    """Küçük dataset: tüm matris tek batch'te (epoch başına bir adım)"""
+    optimizer = torch.optim.AdamW(model.parameters(), lr=lr, weight_decay=weight_decay)
+    loss_fn = torch.nn.CrossEntropyLoss(weight=class_weights)
+    model.train()
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        loss = loss_fn(model(x), y)
+        loss.backward()
+        optimizer.step()
+        if (epoch + 1) % max(1, epochs // 5) == 0:
+            print(f"   epoch {epoch + 1}/{epochs}  loss {loss.item():.4f}")
+    model.eval()
+    return model
+
+
+def fit_temperature(logits, y):
+    """Validation NLL'ini en aza indiren sıcaklık (log-uzayında LBFGS)"""
+    log_t = torch.zeros(1, requires_grad=True)
+    optimizer = torch.optim.LBFGS([log_t], lr=0.1, max_iter=100, line_search_fn="strong_wolfe")
+    loss_fn = torch.nn.CrossEntropyLoss()
+
+    def closure():
+        optimizer.zero_grad()
+        loss = loss_fn(logits / log_t.exp(), y)
+        loss.backward()
+        return loss
+
+    optimizer.step(closure)
+    return float(log_t.detach().exp())
+
+
+def calibration_report(probs, y, bins=10):
+    """(doğruluk, NLL, ECE) — ECE: güven aralıklarında |doğruluk - ortalama güven|"""
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == y
+    nll = float(-np.log(np.maximum(probs[np.arange(len(y)), y], 1e-12)).mean())
+    ece = 0.0
+    edges = np.linspace(0, 1, bins + 1)
+    for low, high in zip(edges[:-1], edges[1:]):
+        mask = (confidence > low) & (confidence <= high)
+        if mask.any():
+            ece += mask.mean() * abs(correct[mask].mean() - confidence[mask].mean())
+    return float(correct.mean()), nll, float(ece)
+
+
+def to_head(model, categories, temperature, store):
+    layers = [module for module in model.modules() if isinstance(module, torch.nn.Linear)]
+    return LinearHead(
+        [(layer.weight.detach().numpy().T, layer.bias.detach().numpy()) for layer in layers],
+        categories, temperature, store.model_id, store.dataset_hash
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature store üzerinde sınıflandırma başlığı eğit")
+    parser.add_argument("--backbone", default=DEFAULT_BACKBONE, choices=list(BACKBONES))
+    parser.add_argument("--backend", default="torch", choices=sorted(BACKENDS),
+                        help="Store varyantı için (int8 kendi store'unu kullanır)")
+    parser.add_argument("--store", default=None, help="Varsayılan: omurganın feature store'u")
+    parser.add_argument("--output", default=None, help="Varsayılan: models/<omurga>_head.npz")
+    parser.add_argument("--hidden", type=int, default=0, help="Gizli katman boyutu (0 = doğrusal)")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--lr", type=float, default=1e-2)
+    parser.add_argument("--weight-decay", type=float, default=1e-4)
+    parser.add_argument("--val", type=float, default=0.2, help="Validation oranı")
+    parser.add_argument("--top-k", type=int, default=20, help="Karşılaştırılan kNN oylaması için")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store_path = Path(args.store or WasteDetector.default_store_path(args.backbone, args.backend))
+    if not (store_path / "manifest.json").exists():
+        print(f"❌ {store_path} bulunamadı, önce 'python build_features.py' çalıştırın")
+        return
+
+    store = FeatureStore.open(store_path)
+    categories = list(store.categories)
+    matrix = normalize_rows(np.asarray(store.vectors, dtype=np.float32))
+    labels = np.asarray(store.labels, dtype=np.int64)
+    train_idx, val_idx = stratified_split(labels, args.val, args.seed)
+    print(f"📊 {len(categories)} kategori, {len(train_idx)} train / {len(val_idx)} validation, "
+          f"boyut {store.dim}")
+
+    torch.manual_seed(args.seed)
+    x = torch.from_numpy(matrix)
+    y = torch.from_numpy(labels)
+
+    # Dengesiz kategoriler: kayıp ağırlıkları sınıf sıklığıyla ters orantılı
+    counts = np.bincount(labels[train_idx], minlength=len(categories)).astype(np.float32)
+    class_weights = torch.from_numpy(counts.sum() / np.maximum(counts, 1) / len(categories))
+
+    kind = f"MLP ({args.hidden})" if args.hidden else "doğrusal"
+    print(f"🔄 {kind} başlık eğitiliyor...")
+    model = train(build_model(store.dim, len(categories), args.hidden), x[train_idx], y[train_idx],
+                  args.epochs, args.lr, args.weight_decay, class_weights)
+
+    temperature = 1.0
+    if len(val_idx):
+        with torch.no_grad():
+            val_logits = model(x[val_idx])
+        temperature = fit_temperature(val_logits, y[val_idx])
+
+        y_val = labels[val_idx]
+        raw_probs = torch.softmax(val_logits, dim=1).numpy()
+        calibrated = to_head(model, categories, temperature, store).predict_proba(matrix[val_idx])
+
+        index = ExactIndex().build(matrix[train_idx])
+        train_labels = [categories[i] for i in labels[train_idx]]
+        knn_votes = [vote(ids, scores, train_labels)
+                     for ids, scores in index.search_batch(matrix[val_idx], args.top_k)]
+        knn_accuracy = np.mean([v == categories[t] for v, t in zip(knn_votes, y_val)])
+
+        print(f"\n{'':<22}{'doğruluk':>10}{'NLL':>9}{'ECE':>9}")
+        for name, probs in (("başlık (T=1)", raw_probs), (f"başlık (T={temperature:.2f})", calibrated)):
+            accuracy, nll, ece = calibration_report(probs, y_val)
+            print(f"{name:<22}{accuracy:>10.3f}{nll:>9.3f}{ece:>9.3f}")
+        print(f"{f'kNN top-{args.top_k} oylama':<22}{knn_accuracy:>10.3f}")
+    else:
+        print("⚠️ Validation seti boş, sıcaklık kalibrasyonu atlandı")
+
+    head = to_head(model, categories, temperature, store)
+    output = Path(args.output or WasteDetector.default_head_path(args.backbone, args.backend))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    head.save(output)
+    print(f"\n✅ Başlık kaydedildi: {output} ({head.memory_bytes() / 1e3:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,138 +1,303 @@
-from ultralytics import YOLO
-import torch
-from pathlib import Path
+"""
+EcoScan YOLOv8 eğitimi.
+
+Presetler (çekirdek sayısı ve boş RAM'e göre ayarlanır):
+    fast-iterate  imgsz 320, 30 epoch, dikdörtgen batch; dataset RAM'e sığıyorsa RAM cache
+    full          imgsz 640, 100 epoch, mosaic augmentation; RAM cache sığmazsa disk cache
+    cpu-lowmem    imgsz 320, küçük batch, en fazla 2 worker, disk cache (decode yükü yok, RAM az)
+
+Her epoch'un süresi ve bellek kullanımı <çıktı klasörü>/perf.json'a yazılır.
+
+Kullanım:
+    python convert_to_yolo.py                       # yolo_dataset/ + data.yaml
+    python train_yolo.py --preset fast-iterate
+    python train_yolo.py --preset full --epochs 150
+    python train_yolo.py --preset cpu-lowmem --workers 1
+"""
+import argparse
+import json
+import os
 import shutil
+import time
+from pathlib import Path
+
+import psutil
+import torch
+from ultralytics import YOLO
+
+# rect=True: en-boy oranına göre gruplanmış batch'ler (daha az padding); Ultralytics
+# bu durumda shuffle'ı kapatır, bu yüzden mosaic'li tam eğitimde kullanılmaz
+PRESETS = {
+    "fast-iterate": {"imgsz": 320, "epochs": 30, "patience": 5, "rect": True, "mosaic": 0.0},
+    "full": {"imgsz": 640, "epochs": 100, "patience": 15, "rect": False, "mosaic": 1.0},
+    "cpu-lowmem": {"imgsz": 320, "epochs": 50, "patience": 10, "rect": True, "mosaic": 0.0},
+}
+# RAM cache, boş belleğin en fazla bu oranını kullanabilir
+RAM_CACHE_FRACTION = 0.5
+
+
+def count_images(data_yaml):
+    images_dir = data_yaml.parent / "images"
+    return sum(1 for p in images_dir.rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+
+
+def choose_cache(preset, n_images, imgsz, available_bytes):
+    """
+    RAM cache: görseller imgsz'e küçültülmüş halde bellekte (~N x imgsz² x 3 byte);
+    disk cache: aynı diziler .npy olarak görsellerin yanında (decode maliyeti yok)
+    """
+    if preset == "cpu-lowmem":
+        return "disk"
+    ram_needed = n_images * imgsz * imgsz * 3
+    if ram_needed < available_bytes * RAM_CACHE_FRACTION:
+        return "ram"
+    return "disk" if preset == "full" else False
+
+
+def resolve_settings(args, cuda_available):
+    """Preset + donanıma göre eğitim parametreleri; komut satırı değerleri önceliklidir"""
+    preset = PRESETS[args.preset]
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    available = psutil.virtual_memory().available
+    imgsz = args.imgsz or preset["imgsz"]
+
+    if args.preset == "cpu-lowmem":
+        workers = min(2, cores)
+        batch = 4
+    else:
+        # Ana süreç eğitimi yürütür; kalan çekirdekler dataloader'a
+        workers = max(1, min(8, cores - 1))
+        batch = 16 if cuda_available or imgsz <= 320 else 8
+
+    settings = {
+        "imgsz": imgsz,
+        "epochs": args.epochs or preset["epochs"],
+        "patience": preset["patience"],
+        "rect": preset["rect"],
+        "mosaic": preset["mosaic"],
+        "batch": args.batch or batch,
+        "workers": args.workers if args.workers is not None else workers,
+        "cache": choose_cache(args.preset, count_images(args.data), imgsz, available)
+        if args.cache is None else {"off": False}.get(args.cache, args.cache),
+    }
+    hardware = {"cores": cores, "available_gb": round(available / 1e9, 1)}
+    return settings, hardware
+
+
+class PerfRecorder:
+    """Epoch süresi ve bellek kullanımı (ana süreç + dataloader worker'ları) kaydı"""
+
+    # Batch sonlarında bellek en fazla bu aralıkla (sn) örneklenir; her örnek
+    # worker süreçlerini de gezdiği için her batch'te ölçülmez
+    SAMPLE_INTERVAL = 1.0
+
+    def __init__(self, settings, hardware):
+        self.process = psutil.Process()
+        self.record = {"settings": settings, "hardware": hardware, "epochs": []}
+        self.epoch_start = None
+        self.last_sample = 0.0
+        self.epoch_peak = 0
+        self.peak_rss = 0
+
+    def rss_bytes(self):
+        total = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    def sample(self):
+        rss = self.rss_bytes()
+        self.epoch_peak = max(self.epoch_peak, rss)
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def on_train_epoch_start(self, trainer):
+        self.epoch_start = time.perf_counter()
+        self.epoch_peak = 0
+
+    def on_train_batch_end(self, trainer):
+        # Tepe bellek epoch ortasında (augmentation, mosaic, collate) oluşur;
+        # epoch sonunda worker'lar boşta olduğundan orada ölçmek düşük kalır
+        now = time.perf_counter()
+        if now - self.last_sample >= self.SAMPLE_INTERVAL:
+            self.last_sample = now
+            self.sample()
+
+    def on_fit_epoch_end(self, trainer):
+        rss = self.sample()
+        entry = {
+            "epoch": trainer.epoch + 1,
+            "seconds": round(time.perf_counter() - self.epoch_start, 2),
+            "rss_mb": round(rss / 1e6),
+            "peak_rss_mb": round(self.epoch_peak / 1e6),
+        }
+        if torch.cuda.is_available():
+            entry["gpu_peak_mb"] = round(torch.cuda.max_memory_allocated() / 1e6)
+        self.record["epochs"].append(entry)
+        print(f"   ⏱️  Epoch {entry['epoch']}: {entry['seconds']:.1f} sn, "
+              f"RSS {entry['rss_mb']} MB (tepe {entry['peak_rss_mb']} MB)")
+
+    def summary(self):
+        epochs = self.record["epochs"]
+        seconds = [e["seconds"] for e in epochs]
+        self.record["mean_epoch_seconds"] = round(sum(seconds) / len(seconds), 2) if seconds else None
+        self.record["peak_rss_mb"] = round(self.peak_rss / 1e6)
+        return self.record
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EcoScan YOLOv8 eğitimi")
+    parser.add_argument("--preset", default="full", choices=sorted(PRESETS))
+    parser.add_argument("--data", type=Path, default=Path("yolo_dataset/data.yaml"))
+    parser.add_argument("--model", default="yolov8n.pt", help="Başlangıç ağırlıkları")
+    parser.add_argument("--epochs", type=int, default=None)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", choices=["ram", "disk", "off"], default=None,
+                        help="Görsel önbelleği (varsayılan: presete ve boş RAM'e göre)")
+    parser.add_argument("--name", default="ecoscan_model")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🎯 EcoScan - YOLOv8 Model Eğitimi")
+    print("=" * 60)
+
+    # GPU kontrolü
+    cuda_available = torch.cuda.is_available()
+    device = 'cuda' if cuda_available else 'cpu'
+
+    print(f"\n🔍 CUDA kullanılabilir: {cuda_available}")
+    print(f"🔍 Eğitim device: {device}")
+
+    if cuda_available:
+        print(f"🎮 GPU: {torch.cuda.get_device_name(0)}")
+        print(f"💾 GPU Memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.2f} GB")
+
+    # Dataset kontrolü
+    if not args.data.exists():
+        print(f"\n❌ HATA: {args.data} bulunamadı!")
+        print("📋 Önce 'python convert_to_yolo.py' komutunu çalıştırın")
+        raise SystemExit(1)
+
+    # Ultralytics göreli yolları kendi datasets klasörüne göre çözer; mutlak yol ver
+    data_yaml = args.data.resolve()
+    print(f"\n✅ Dataset YAML: {data_yaml}")
+
+    settings, hardware = resolve_settings(args, cuda_available)
+    print(f"\n⚙️  Preset: {args.preset} ({hardware['cores']} çekirdek, "
+          f"{hardware['available_gb']} GB boş RAM)")
+    for key, value in settings.items():
+        print(f"   {key}: {value}")
+
+    print(f"\n📥 {args.model} modeli yükleniyor...")
+    model = YOLO(args.model)
+
+    recorder = PerfRecorder(settings, hardware)
+    model.add_callback("on_train_epoch_start", recorder.on_train_epoch_start)
+    model.add_callback("on_train_batch_end", recorder.on_train_batch_end)
+    model.add_callback("on_fit_epoch_end", recorder.on_fit_epoch_end)
+
+    print("\n" + "=" * 60)
+    print("🚀 EĞİTİM BAŞLIYOR...")
+    print("=" * 60)
+    print("\n⏸️  İptal için: Ctrl+C")
+    print("=" * 60 + "\n")
+
+    results = model.train(
+        # Dataset
+        data=str(data_yaml),
+
+        # Preset'e göre model / veri yükleme ayarları
+        **settings,
+
+        # Çıktı
+        name=args.name,
+        project='runs/detect',
+        save=True,
+        save_period=10,         # Her 10 epoch'ta kaydet
+
+        # Device
+        device=device,
+        pretrained=True,        # Pretrained weights kullan
+
+        # Data Augmentation (veri çeşitlendirme)
+        degrees=15.0,           # Rotasyon
+        translate=0.1,          # Kaydırma
+        scale=0.5,              # Ölçekleme
+        shear=0.0,              # Yamultma
+        perspective=0.0,        # Perspektif
+        flipud=0.5,             # Dikey çevirme
+        fliplr=0.5,             # Yatay çevirme
+        mixup=0.0,              # Mixup augmentation
+
+        # Optimizer
+        optimizer='auto',       # Adam/SGD otomatik seçim
+        lr0=0.01,               # İlk learning rate
+        lrf=0.01,               # Final learning rate
+        momentum=0.937,
+        weight_decay=0.0005,
+
+        # Validation
+        val=True,
+        plots=True,             # Grafikler oluştur
+
+        # Logging
+        verbose=True,
+    )
+
+    # Ultralytics aynı isim varsa klasörü numaralandırır (ecoscan_model2, ...)
+    save_dir = Path(model.trainer.save_dir)
+    perf_path = save_dir / "perf.json"
+    recorder.save(perf_path)
+    summary = recorder.summary()
+
+    print("\n" + "=" * 60)
+    print("✅ EĞİTİM TAMAMLANDI!")
+    print("=" * 60)
+
+    # Sonuçları göster
+    print("\n📊 Eğitim Sonuçları:")
+    print(f"   Final mAP50: {results.results_dict.get('metrics/mAP50(B)', 0):.3f}")
+    print(f"   Final mAP50-95: {results.results_dict.get('metrics/mAP50-95(B)', 0):.3f}")
+    print(f"   Ortalama epoch süresi: {summary['mean_epoch_seconds']} sn")
+    print(f"   Tepe RSS: {summary['peak_rss_mb']} MB  ({perf_path})")
+
+    # En iyi modeli kopyala
+    best_model_path = save_dir / "weights" / "best.pt"
+
+    if best_model_path.exists():
+        output_dir = Path("models")
+        output_dir.mkdir(exist_ok=True)
+        output_path = output_dir / "best.pt"
+
+        shutil.copy(best_model_path, output_path)
+
+        print("\n✅ En iyi model kaydedildi:")
+        print(f"   📁 {output_path.absolute()}")
+        print(f"   📏 Dosya boyutu: {output_path.stat().st_size / 1e6:.2f} MB")
+    else:
+        print(f"\n⚠️ Model dosyası bulunamadı: {best_model_path}")
+
+    print("\n📂 Tüm eğitim sonuçları:")
+    print(f"   {save_dir.absolute()}")
+
+    print("\n" + "=" * 60)
+    print("🎉 SÜREÇ TAMAMLANDI!")
+    print("=" * 60)
+    print("\n📋 Sonraki adımlar:")
+    print("   1. Backend'i yeniden başlatın: ECOSCAN_ENGINE=yolo python main.py")
+    print("   2. Flutter uygulamasını test edin")
+    print(f"   3. Sonuçları kontrol edin: {save_dir}")
+    print()
+
 
-print("="*60)
-print("🎯 EcoScan - YOLOv8 Model Eğitimi")
-print("="*60)
-
-# GPU kontrolü
-cuda_available = torch.cuda.is_available()
-device = 'cuda' if cuda_available else 'cpu'
-
-print(f"\n🔍 CUDA kullanılabilir: {cuda_available}")
-print(f"🔍 Eğitim device: {device}")
-
-if cuda_available:
-    print(f"🎮 GPU: {torch.cuda.get_device_name(0)}")
-    print(f"💾 GPU Memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.2f} GB")
-else:
-    print("⚠️  GPU bulunamadı, CPU ile eğitim yapılacak (yavaş olacak)")
-    print("💡 Önerilen: Google Colab ile GPU kullanın")
-
-# Dataset kontrolü
-data_yaml = Path("yolo_dataset/data.yaml")
-if not data_yaml.exists():
-    print(f"\n❌ HATA: {data_yaml} bulunamadı!")
-    print("📋 Önce 'python convert_to_yolo.py' komutunu çalıştırın")
-    exit(1)
-
-print(f"\n✅ Dataset YAML: {data_yaml}")
-
-# YOLOv8 nano model (hızlı ve hafif)
-print("\n📥 YOLOv8n modeli yükleniyor...")
-model = YOLO('yolov8n.pt')
-
-print("\n" + "="*60)
-print("🚀 EĞİTİM BAŞLIYOR...")
-print("="*60)
-print("\n⏱️  Tahmini Süre:")
-print("   CPU: 1-2 saat")
-print("   GPU: 15-30 dakika")
-print("\n📊 Eğitim sırasında:")
-print("   - Loss değerleri düşecek")
-print("   - mAP değerleri yükselecek")
-print("   - runs/detect/ecoscan_model/ klasöründe sonuçlar kaydedilecek")
-print("\n⏸️  İptal için: Ctrl+C")
-print("="*60 + "\n")
-
-# Eğitim parametreleri
-results = model.train(
-    # Dataset
-    data=str(data_yaml),
-    
-    # Model ayarları
-    epochs=100,              # Epoch sayısı (daha fazla = daha iyi, ama yavaş)
-    imgsz=640,              # Görsel boyutu (640 optimal)
-    batch=16 if cuda_available else 8,  # GPU varsa daha büyük batch
-    
-    # Çıktı
-    name='ecoscan_model',
-    project='runs/detect',
-    
-    # Optimizasyon
-    patience=15,            # 15 epoch boyunca iyileşme yoksa dur
-    save=True,
-    save_period=10,         # Her 10 epoch'ta kaydet
-    
-    # Device
-    device=device,
-    workers=4 if cuda_available else 2,
-    
-    # Performans
-    cache=False,            # RAM kullanımı için False
-    pretrained=True,        # Pretrained weights kullan
-    
-    # Data Augmentation (veri çeşitlendirme)
-    degrees=15.0,           # Rotasyon
-    translate=0.1,          # Kaydırma
-    scale=0.5,              # Ölçekleme
-    shear=0.0,              # Yamultma
-    perspective=0.0,        # Perspektif
-    flipud=0.5,             # Dikey çevirme
-    fliplr=0.5,             # Yatay çevirme
-    mosaic=1.0,             # Mosaic augmentation
-    mixup=0.0,              # Mixup augmentation
-    
-    # Optimizer
-    optimizer='auto',       # Adam/SGD otomatik seçim
-    lr0=0.01,              # İlk learning rate
-    lrf=0.01,              # Final learning rate
-    momentum=0.937,
-    weight_decay=0.0005,
-    
-    # Validation
-    val=True,
-    plots=True,             # Grafikler oluştur
-    
-    # Logging
-    verbose=True,
-)
-
-print("\n" + "="*60)
-print("✅ EĞİTİM TAMAMLANDI!")
-print("="*60)
-
-# Sonuçları göster
-print(f"\n📊 Eğitim Sonuçları:")
-print(f"   Final mAP50: {results.results_dict.get('metrics/mAP50(B)', 0):.3f}")
-print(f"   Final mAP50-95: {results.results_dict.get('metrics/mAP50-95(B)', 0):.3f}")
-
-# En iyi modeli kopyala
-best_model_path = Path("runs/detect/ecoscan_model/weights/best.pt")
-
-if best_model_path.exists():
-    output_dir = Path("models")
-    output_dir.mkdir(exist_ok=True)
-    output_path = output_dir / "best.pt"
-    
-    shutil.copy(best_model_path, output_path)
-    
-    print(f"\n✅ En iyi model kaydedildi:")
-    print(f"   📁 {output_path.absolute()}")
-    print(f"   📏 Dosya boyutu: {output_path.stat().st_size / 1e6:.2f} MB")
-else:
-    print(f"\n⚠️ Model dosyası bulunamadı: {best_model_path}")
-
-print("\n📂 Tüm eğitim sonuçları:")
-print(f"   {Path('runs/detect/ecoscan_model').absolute()}")
-
-print("\n" + "="*60)
-print("🎉 SÜREÇ TAMAMLANDI!")
-print("="*60)
-print("\n📋 Sonraki adımlar:")
-print("   1. Backend'i yeniden başlatın: python main.py")
-print("   2. Flutter uygulamasını test edin")
-print("   3. Sonuçları kontrol edin: runs/detect/ecoscan_model/")
-print()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
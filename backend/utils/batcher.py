@@ -0,0 +1,131 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Eşzamanlı istekleri tek bir batch'te toplayıp ayrı bir inference
+    thread'inde işler. Event loop forward pass sırasında bloklanmaz.
+
+    process_fn: öğe listesi alır, aynı sırada sonuç listesi döndürür
+    max_batch_size: tek forward pass'teki en fazla öğe
+    max_wait_ms: ilk öğe geldikten sonra batch'in dolmasını bekleme süresi
+
+    submit_many() ile gelen gruplar bölünmez; max_batch_size'dan büyük bir
+    grup tek başına, tek forward pass'te işlenir.
+    """
+
+    def __init__(self, process_fn, max_batch_size=8, max_wait_ms=10, name="inference"):
+        self.process_fn = process_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self._queue = queue.Queue()
+        self._carry = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def qsize(self):
+        """Bekleyen istek sayısı"""
+        return self._queue.qsize()
+
+    def _enqueue(self, items, single):
+        if self._stopped.is_set():
+            raise RuntimeError("MicroBatcher durduruldu")
+        future = Future()
+        self._queue.put((list(items), future, single))
+        return future
+
+    def submit(self, item):
+        """Öğeyi kuyruğa ekle; sonucu taşıyan concurrent Future döndür"""
+        return self._enqueue([item], single=True)
+
+    def submit_many(self, items):
+        """Öğeleri tek grup olarak kuyruğa ekle; Future sonuç listesini taşır"""
+        return self._enqueue(items, single=False)
+
+    async def run(self, item):
+        """submit() için asyncio sarmalayıcısı"""
+        return await asyncio.wrap_future(self.submit(item))
+
+    async def run_many(self, items):
+        """submit_many() için asyncio sarmalayıcısı"""
+        if not items:
+            return []
+        return await asyncio.wrap_future(self.submit_many(items))
+
+    def stop(self, timeout=5.0):
+        """Thread'i durdur; kuyrukta kalanlar iptal edilir"""
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                entry[1].cancel()
+        if self._carry is not None:
+            self._carry[1].cancel()
+            self._carry = None
+
+    def _collect(self):
+        """İlk girdiyi bekle, sonra süre dolana ya da batch dolana kadar topla"""
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._stopped.set()
+                break
+            if size + len(entry[0]) > self.max_batch_size:
+                # Grup bölünmez; bir sonraki batch'e kalır
+                self._carry = entry
+                break
+            batch.append(entry)
+            size += len(entry[0])
+
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            # İptal edilmiş (istemcisi kopmuş) istekleri işleme
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            items = [item for entry_items, _, _ in batch for item in entry_items]
+            try:
+                results = self.process_fn(items)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for entry_items, future, single in batch:
+                chunk = results[offset:offset + len(entry_items)]
+                offset += len(entry_items)
+                future.set_result(chunk[0] if single else list(chunk))
@@ -0,0 +1,71 @@
+import numpy as np
+
+from utils.vector_index import IVFIndex, normalize_rows
+
+
+class CentroidClassifier:
+    """
+    Kategori başına prototip(ler) ile hızlı sınıflandırma.
+
+    prototypes=1 ise her kategorinin normalize ortalaması kullanılır; daha
+    büyük değerlerde kategori içi spherical k-means ile birden çok prototip
+    çıkarılır (çok modlu sınıflar için). Kategori skoru, o kategorinin en
+    yakın prototipine olan cosine benzerliğidir.
+    """
+
+    def __init__(self, prototypes=1, seed=0):
+        self.prototypes_per_class = max(1, int(prototypes))
+        self.seed = seed
+        self.prototypes = np.zeros((0, 0), dtype=np.float32)
+        self.prototype_labels = np.zeros(0, dtype=np.int32)
+        self.n_categories = 0
+
+    def __len__(self):
+        return len(self.prototypes)
+
+    def build(self, vectors, label_ids, n_categories):
+        """Normalize edilmiş vektörler ve kategori id'lerinden prototipleri kur"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        label_ids = np.asarray(label_ids)
+        self.n_categories = n_categories
+
+        prototypes, labels = [], []
+        for category in range(n_categories):
+            members = vectors[label_ids == category]
+            if len(members) == 0:
+                continue
+            if self.prototypes_per_class == 1 or len(members) <= self.prototypes_per_class:
+                centers = normalize_rows(members.mean(axis=0))
+            else:
+                ivf = IVFIndex(nlist=self.prototypes_per_class, seed=self.seed)
+                centers = ivf.build(members).centroids
+            prototypes.append(centers)
+            labels.extend([category] * len(centers))
+
+        if prototypes:
+            self.prototypes = np.ascontiguousarray(np.concatenate(prototypes), dtype=np.float32)
+            self.prototype_labels = np.asarray(labels, dtype=np.int32)
+        return self
+
+    def scores(self, queries):
+        """(Q, C) kategori skorları; prototipi olmayan kategoriler -inf"""
+        queries = np.asarray(queries, dtype=np.float32)
+        result = np.full((len(queries), self.n_categories), -np.inf, dtype=np.float32)
+        if len(self.prototypes) == 0:
+            return result
+
+        similarities = queries @ self.prototypes.T
+        for category in np.unique(self.prototype_labels):
+            columns = self.prototype_labels == category
+            result[:, category] = similarities[:, columns].max(axis=1)
+        return result
+
+    def classify(self, queries):
+        """Her sorgu için (kategori id, skor, ilk iki kategori arasındaki fark, skorlar)"""
+        results = []
+        for row in self.scores(queries):
+            order = np.argsort(-row)
+            best = int(order[0])
+            second = row[order[1]] if len(order) > 1 and np.isfinite(row[order[1]]) else -1.0
+            results.append((best, float(row[best]), float(row[best] - second), row))
+        return results
@@ -0,0 +1,411 @@
+import inspect
+import json
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from utils.feature_store import FeatureStore, file_fingerprint, migrate_legacy_pickle
+from utils.image_decode import load_image
+from utils.inference_backends import (
+    DEFAULT_BACKBONE, Preprocess, backend_variant, check_backbone, create_backend
+)
+from utils.metrics import BATCH_SIZE, STAGE_SECONDS
+from utils.vector_index import create_index, load_index, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+# Aynı ayarlarla istenen motorlar süreç içinde tek kopya (bkz. EmbeddingEngine.shared)
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def describe_input(image):
+    """Log mesajları için girdinin kısa tanımı"""
+    if isinstance(image, (str, Path)):
+        return str(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return f"<{len(image)} byte>"
+    return f"<{type(image).__name__}>"
+
+
+class EmbeddingEngine:
+    """
+    Omurga modeli + ön işleme + feature store + arama indeksi.
+
+    WasteDetector ve ImageMatcher bu sınıfı sarar; shared() ile alınan motor süreç
+    başına bir kez yüklenir, böylece model ağırlıkları, feature matrisi ve indeks
+    iki API arasında paylaşılır ve arama iyileştirmeleri ikisine birden uygulanır.
+    """
+    # Feature store manifest'ine yazılır; uyuşmayan depolar yeniden üretilir
+    # (varsayılan omurga; diğerleri için bkz. model_id_for)
+    MODEL_ID = "torchvision/resnet50:IMAGENET1K_V1"
+    PREPROCESSING = {
+        'resize': [224, 224],
+        'mean': [0.485, 0.456, 0.406],
+        'std': [0.229, 0.224, 0.225],
+        # JPEG'ler model boyutuna yakın decode edilir ve EXIF yönü uygulanır
+        # (bkz. utils/image_decode.py); bu anahtarı olmayan depolar tam decode ile üretilmiş
+        'decode': 'draft+exif'
+    }
+    # features.pkl dönemindeki ön işleme; taşınan eski vektörler bununla işaretlenir
+    LEGACY_PREPROCESSING = {key: value for key, value in PREPROCESSING.items() if key != 'decode'}
+    # JPEG'lerin decode edildiği (genişlik, yükseklik); resize (yükseklik, genişlik) sırasında
+    DECODE_SIZE = tuple(reversed(PREPROCESSING['resize']))
+
+    def __init__(self, dataset_path="dataset", index_type="exact", index_params=None,
+                 store_path=None, legacy_cache_path="features.pkl", max_per_category=200,
+                 batch_size=32, num_workers=None, backend="torch", backend_path=None,
+                 backbone=DEFAULT_BACKBONE, threads=None, known_categories=None):
+        """
+        Parametreler WasteDetector ile aynı anlamdadır; ek olarak:
+        known_categories: dataset taranırken kabul edilen kategori klasörleri (None = hepsi)
+        """
+        self.dataset_path = Path(dataset_path)
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.backbone = check_backbone(backbone)
+        self.backend = backend
+        # Farklı omurga / quantize model farklı embedding üretir: ayrı model kimliği ve ayrı store
+        self.model_id = self.model_id_for(backbone, backend)
+        self.store_path = Path(store_path or self.default_store_path(backbone, backend))
+        # Eski features.pkl float ResNet50 ile üretildi; sadece o modelde taşınır
+        if self.model_id != self.MODEL_ID:
+            legacy_cache_path = None
+        self.legacy_cache_path = Path(legacy_cache_path) if legacy_cache_path else None
+        self.max_per_category = max_per_category
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.known_categories = set(known_categories) if known_categories is not None else None
+        self.categories = []
+        self.store = None
+        self._lock = threading.Lock()
+
+        # Arama indeksi: normalize edilmiş float32 matris + paralel kategori id dizisi
+        self.feature_matrix = np.zeros((0, 0), dtype=np.float32)
+        self.label_ids = np.zeros(0, dtype=np.int32)
+        self.label_names = []
+        self.index_paths = []
+        self.index = create_index(self.index_type, **self.index_params)
+
+        # Feature extractor (sınıflandırıcısı çıkarılmış omurga) yükle
+        logger.info(f"🔄 {backbone} modeli yükleniyor ({backend})...")
+        self.embed = create_backend(backend, backend_path, backbone, threads)
+
+        # Görsel ön işleme (Resize + ToTensor + Normalize eşdeğeri)
+        self.transform = self.make_transform()
+        # JPEG'ler bu boyuta yakın decode edilir (draft, bkz. utils/image_decode.py);
+        # referans ve sorgu görselleri aynı yoldan geçer
+        self.decode_size = self.DECODE_SIZE
+
+    @classmethod
+    def shared(cls, threads=None, batch_size=32, num_workers=None, **config):
+        """
+        Aynı model / store / indeks ayarları için süreçteki tek motor; yoksa oluşturulur.
+        threads, batch_size ve num_workers embedding'i değiştirmez: ilk oluşturanınki geçerli.
+        """
+        key = cls._shared_key(config)
+        with _shared_lock:
+            engine = _shared.get(key)
+            if engine is None:
+                engine = _shared[key] = cls(threads=threads, batch_size=batch_size,
+                                            num_workers=num_workers, **config)
+            return engine
+
+    @classmethod
+    def _shared_key(cls, config):
+        """Varsayılanlar doldurulmuş, yolları normalize edilmiş ayarların JSON'u"""
+        bound = inspect.signature(cls).bind(**config)
+        bound.apply_defaults()
+        args = dict(bound.arguments)
+        for name in ("threads", "batch_size", "num_workers"):
+            args.pop(name)
+        args['store_path'] = str(Path(args['store_path'] or
+                                      cls.default_store_path(args['backbone'], args['backend'])))
+        args['dataset_path'] = str(Path(args['dataset_path']))
+        if args['known_categories'] is not None:
+            args['known_categories'] = sorted(args['known_categories'])
+        return json.dumps(args, sort_keys=True, default=str)
+
+    @classmethod
+    def model_id_for(cls, backbone=DEFAULT_BACKBONE, backend="torch"):
+        """Store manifest'indeki model kimliği: omurga + (varsa) quantize varyantı"""
+        variant = backend_variant(backend)
+        model_id = f"torchvision/{check_backbone(backbone)}:IMAGENET1K_V1"
+        return f"{model_id}+{variant}" if variant else model_id
+
+    @classmethod
+    def make_transform(cls):
+        """PREPROCESSING'e göre model girdisi dönüşümü (resize + normalize)"""
+        return Preprocess(
+            size=cls.PREPROCESSING['resize'],
+            mean=cls.PREPROCESSING['mean'],
+            std=cls.PREPROCESSING['std']
+        )
+
+    @classmethod
+    def preprocess_files(cls, paths):
+        """
+        Görsel dosyalarını servisle aynı yoldan (JPEG draft decode + EXIF + ön işleme)
+        (N, 3, H, W) float32 batch'e çevir; model yüklemeden araçlar için
+        """
+        transform = cls.make_transform()
+        return np.stack([transform(load_image(path, cls.DECODE_SIZE)) for path in paths])
+
+    @staticmethod
+    def default_store_path(backbone=DEFAULT_BACKBONE, backend="torch"):
+        """Varsayılan ResNet50 için "feature_store", diğerleri için sonekli klasör"""
+        parts = ["feature_store"]
+        if backbone != DEFAULT_BACKBONE:
+            parts.append(backbone)
+        variant = backend_variant(backend)
+        if variant:
+            parts.append(variant)
+        return "_".join(parts)
+
+    def load(self):
+        """Feature store'u (yoksa dataset'i tarayarak) bir kez yükle; store'u döndür"""
+        with self._lock:
+            if self.store is None:
+                store = self.open_store()
+                if store is None:
+                    logger.info("🔄 Dataset taranıyor (Cache bulunamadı)...")
+                    features = self._load_dataset()
+                    # Parmak izleriyle kaydedilir: build_features.py bu vektörleri yeniden kullanır
+                    store = FeatureStore.from_features(
+                        features, self.model_id, self.PREPROCESSING,
+                        extra={'fingerprints': {path: file_fingerprint(path) for path in features}}
+                    )
+                    self.use_store(store)
+                    # Tarama bir kez yapılsın: sonraki açılışlar (ve diğer worker'lar) store'u okur
+                    if len(store):
+                        self.save_features()
+                        self.save_index()
+                else:
+                    self.use_store(store)
+            return self.store
+
+    def is_loaded(self):
+        return len(self.feature_matrix) > 0
+
+    def open_store(self):
+        """Feature store'u memmap ile aç; yoksa eski features.pkl'i taşı"""
+        try:
+            if (self.store_path / "manifest.json").exists():
+                store = FeatureStore.open(self.store_path)
+                logger.info(f"🚀 Feature store bulundu: {self.store_path}")
+            elif self.legacy_cache_path is not None and self.legacy_cache_path.exists():
+                # Eski vektörler güncel ön işlemeyle uyuşmuyorsa taşınmaz: yazılan store
+                # hemen reddedilir ve features.pkl'i sonraki her açılışta gölgelerdi
+                if self.LEGACY_PREPROCESSING != self.PREPROCESSING:
+                    logger.warning(f"⚠️ {self.legacy_cache_path} eski ön işleme ile üretilmiş, "
+                                   f"taşınmıyor (dataset yeniden taranacak)")
+                    return None
+                logger.info(f"🔄 Eski cache taşınıyor: {self.legacy_cache_path} → {self.store_path}")
+                store = migrate_legacy_pickle(
+                    self.legacy_cache_path, self.store_path, self.model_id, self.LEGACY_PREPROCESSING
+                )
+            else:
+                return None
+        except Exception as e:
+            logger.warning(f"⚠️ Cache okuma hatası: {e}")
+            return None
+
+        if store.model_id != self.model_id:
+            logger.warning(f"⚠️ Feature store farklı bir model ile üretilmiş: {store.model_id}")
+            return None
+        if store.preprocessing != self.PREPROCESSING:
+            logger.warning(f"⚠️ Feature store farklı bir ön işleme ile üretilmiş: {store.preprocessing} "
+                           f"(python build_features.py ile yeniden oluşturun)")
+            return None
+
+        logger.info(f"✅ {len(store)} görsel yüklendi (Cache)")
+        return store
+
+    def use_store(self, store, rebuild_index=False):
+        """
+        Store'daki matris ve etiketleri arama indeksine bağla.
+        rebuild_index=True ise kayıtlı indeks dosyasına bakılmadan yeniden kurulur.
+        """
+        self.store = store
+        self.categories = list(store.categories)
+        self.feature_matrix = np.asarray(store.vectors)
+        self.label_ids = np.asarray(store.labels)
+        self.label_names = store.categories
+        self.index_paths = store.paths
+
+        if len(store) == 0:
+            self.index = create_index(self.index_type, **self.index_params)
+        else:
+            self.index = self._load_or_build_index(rebuild_index)
+
+    def save_features(self, path=None):
+        """Özellikleri feature store olarak kaydet"""
+        path = Path(path) if path else self.store_path
+        try:
+            self.store.save(path)
+            logger.info(f"✅ Özellikler kaydedildi: {path}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Kayıt hatası: {e}")
+            return False
+
+    def _index_file(self):
+        return self.store_path / f"index_{self.index_type}.npz"
+
+    def _load_or_build_index(self, rebuild=False):
+        """Kayıtlı indeks uyumluysa yükle, değilse feature matrisinden kur"""
+        index_file = self._index_file()
+        if index_file.exists() and not rebuild:
+            try:
+                # Özet görsel yollarını ve etiketlerini kapsar: sayı aynı olsa da
+                # farklı bir dataset için kurulmuş indeks kullanılmaz
+                index = load_index(index_file, self.feature_matrix, self.store.dataset_hash)
+                # Açıkça istenen ayarlar (--pca-dim, --pq-m, ...) dosyadakinden farklıysa
+                # eski indeks kullanılmaz; ayar verilmemişse kaydedilen indeks kabul edilir
+                saved = index.params or {}
+                changed = {k: v for k, v in self.index_params.items() if saved.get(k) != v}
+                if index.kind == self.index_type and not changed:
+                    logger.info(f"🚀 İndeks yüklendi: {index_file} ({index.kind})")
+                    return index
+                logger.warning(f"⚠️ İndeks farklı ayarlarla kurulmuş ({index.kind} {saved}), "
+                               f"yeniden kuruluyor: {self.index_type} {self.index_params}")
+            except Exception as e:
+                logger.warning(f"⚠️ İndeks okuma hatası: {e}")
+
+        index = create_index(self.index_type, **self.index_params)
+        return index.build(self.feature_matrix)
+
+    def save_index(self, path=None):
+        """Arama indeksini dosyaya kaydet"""
+        path = Path(path) if path else self._index_file()
+        try:
+            self.index.save(path, self.store.dataset_hash)
+            logger.info(f"✅ İndeks kaydedildi: {path} ({self.index.kind})")
+            return True
+        except Exception as e:
+            logger.error(f"❌ İndeks kayıt hatası: {e}")
+            return False
+
+    def list_dataset_images(self):
+        """Dataset'teki (kategori, görsel yolu) çiftlerini listele"""
+        if not self.dataset_path.exists():
+            logger.warning(f"⚠️ Dataset klasörü bulunamadı: {self.dataset_path}")
+            return []
+
+        images = []
+
+        for category_folder in self.dataset_path.iterdir():
+            if not category_folder.is_dir():
+                continue
+
+            category = category_folder.name.lower()
+
+            if self.known_categories is not None and category not in self.known_categories:
+                logger.warning(f"⚠️ Bilinmeyen kategori: {category}")
+                continue
+
+            # Görselleri bul
+            image_files = (list(category_folder.glob("*.jpg")) +
+                           list(category_folder.glob("*.jpeg")) +
+                           list(category_folder.glob("*.png")))
+
+            logger.info(f"📂 {category}: {len(image_files)} görsel bulundu")
+
+            # Kategori başına görsel sınırı (None = hepsi)
+            for img_path in image_files[:self.max_per_category]:
+                images.append((category, img_path))
+
+        return images
+
+    def _load_dataset(self):
+        """Dataset'teki tüm görsellerin özelliklerini çıkar (path -> {features, category})"""
+        features_cache = {}
+        images = self.list_dataset_images()
+        all_features = self.extract_features_batch([img_path for _, img_path in images])
+
+        for (category, img_path), features in zip(images, all_features):
+            if features is not None:
+                features_cache[str(img_path)] = {
+                    'features': features,
+                    'category': category
+                }
+
+        categories = {data['category'] for data in features_cache.values()}
+        logger.info(f"✅ {len(features_cache)} görsel yüklendi, {len(categories)} kategori")
+        return features_cache
+
+    def prepare_input(self, image):
+        """Görseli model girdisine (C x H x W float32 dizi) çevir"""
+        with STAGE_SECONDS.time("decode"):
+            decoded = load_image(image, self.decode_size)
+        with STAGE_SECONDS.time("transform"):
+            return self.transform(decoded)
+
+    def extract_features(self, image):
+        """Tek görselin embedding'i; açılamazsa None"""
+        return self.extract_features_many([image])[0]
+
+    def extract_features_many(self, images, label="knn"):
+        """
+        Birden çok sorgu görselini tek forward pass'te işle (hatalı olanlar None);
+        label: batch boyutu ölçümünün etiketi (çağıran engine)
+        """
+        results = [None] * len(images)
+        inputs = []
+        positions = []
+
+        for i, image in enumerate(images):
+            try:
+                inputs.append(self.prepare_input(image))
+                positions.append(i)
+            except Exception:
+                logger.warning(f"⚠️ Feature extraction hatası: {describe_input(image)}")
+
+        if inputs:
+            BATCH_SIZE.observe(len(inputs), label)
+            with STAGE_SECONDS.time("inference"):
+                features = self.embed(np.stack(inputs))
+
+            for i, row in zip(positions, features):
+                results[i] = row
+
+        return results
+
+    def extract_features_batch(self, image_paths):
+        """Birden çok görseli batch'ler halinde işle (paralel decode + tek forward)"""
+        # DataLoader torch gerektirir; sadece indeksleme sırasında yüklenir
+        from utils.feature_extraction import extract_features_batched
+
+        return extract_features_batched(
+            self.embed, self.transform, image_paths,
+            batch_size=self.batch_size, num_workers=self.num_workers, decode_size=self.decode_size
+        )
+
+    def search_many(self, all_features, top_k=20):
+        """Birden çok sorgu için en benzer referans görseller (cosine, indeks üzerinden)"""
+        results = [[] for _ in all_features]
+        positions = [i for i, f in enumerate(all_features) if f is not None]
+
+        if not positions or len(self.feature_matrix) == 0:
+            return results
+
+        queries = normalize_rows(np.stack([all_features[i] for i in positions]))
+
+        for i, (top_idx, similarities) in zip(positions, self.index.search_batch(queries, top_k)):
+            results[i] = [
+                {
+                    'category': self.label_names[self.label_ids[j]],
+                    'similarity': float(score),
+                    'path': self.index_paths[j]
+                }
+                for j, score in zip(top_idx, similarities)
+            ]
+
+        return results
+
+    def warm_up(self):
+        """Boş bir görselle tek forward pass (ilk istekteki bellek ayırma maliyeti başlangıçta)"""
+        self.embed(self.prepare_input(Image.new('RGB', tuple(self.PREPROCESSING['resize'])))[None])
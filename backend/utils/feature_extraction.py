@@ -0,0 +1,93 @@
+import logging
+import os
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+
+from utils.image_decode import load_image
+
+logger = logging.getLogger(__name__)
+
+# İlerleme satırı en fazla bu aralıkla (sn) loglanır
+PROGRESS_INTERVAL = 5.0
+
+
+def default_num_workers():
+    """Decode/ön işleme için varsayılan worker sayısı"""
+    return min(8, os.cpu_count() or 1)
+
+
+class ImageFileDataset(Dataset):
+    """Görsel yollarını decode + transform edip (tensor, sıra, başarılı mı) döndürür"""
+
+    def __init__(self, paths, transform, decode_size=None):
+        self.paths = [str(p) for p in paths]
+        self.transform = transform
+        self.decode_size = decode_size
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        try:
+            img = load_image(self.paths[i], self.decode_size)
+            return self.transform(img), i, True
+        except Exception:
+            # Bozuk dosya batch'i düşürmesin; sonuçta None olarak işaretlenir
+            return self.transform(Image.new('RGB', (224, 224))), i, False
+
+
+def extract_features_batched(embed, transform, paths, batch_size=32, num_workers=None,
+                             progress=True, decode_size=None):
+    """
+    Görselleri worker havuzunda decode edip modelden batch'ler halinde geçir.
+    embed: (N, 3, H, W) batch alıp (N, D) numpy döndüren backend (bkz. inference_backends.py)
+    decode_size: JPEG'lerin küçültülerek decode edileceği (genişlik, yükseklik), bkz. load_image
+    paths ile aynı sırada (vektör veya None) listesi döndürür.
+    """
+    paths = list(paths)
+    results = [None] * len(paths)
+    if not paths:
+        return results
+
+    if num_workers is None:
+        num_workers = default_num_workers()
+
+    loader = DataLoader(
+        ImageFileDataset(paths, transform, decode_size),
+        batch_size=batch_size,
+        num_workers=num_workers,
+        shuffle=False,
+        persistent_workers=False,
+    )
+
+    start = last_report = time.perf_counter()
+    done = 0
+
+    with torch.inference_mode():
+        for tensors, indices, ok in loader:
+            features = embed(tensors.numpy())
+
+            for row, i, valid in zip(features, indices.tolist(), ok.tolist()):
+                if valid:
+                    results[i] = np.array(row, dtype=np.float32)
+                else:
+                    logger.warning(f"⚠️ Feature extraction hatası: {paths[i]}")
+
+            done += len(indices)
+            now = time.perf_counter()
+            if progress and done < len(paths) and now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                rate = done / max(now - start, 1e-9)
+                logger.info(f"⏳ {done}/{len(paths)} görsel ({rate:.1f} görsel/sn)")
+
+    elapsed = time.perf_counter() - start
+    if progress:
+        logger.info(f"⚡ {len(paths)} görsel {elapsed:.1f} sn'de işlendi "
+                    f"({len(paths) / max(elapsed, 1e-9):.1f} görsel/sn, batch={batch_size}, "
+                    f"worker={num_workers})")
+
+    return results
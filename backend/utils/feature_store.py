@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from utils.vector_index import normalize_rows
+
+# 2: dataset_hash görsel içerik özetlerini de kapsar
+STORE_VERSION = 2
+
+VECTORS_FILE = "vectors.f32"
+LABELS_FILE = "labels.npy"
+MANIFEST_FILE = "manifest.json"
+
+
+def content_hash(path, chunk_size=1 << 20):
+    """Dosya içeriğinin sha1 özeti"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, previous=None):
+    """
+    (boyut, mtime_ns, içerik özeti) üçlüsü.
+    Boyut ve mtime önceki kayıtla aynıysa dosya yeniden okunmaz.
+    """
+    stat = os.stat(path)
+    if previous is not None and previous[0] == stat.st_size and previous[1] == stat.st_mtime_ns:
+        return list(previous)
+    return [stat.st_size, stat.st_mtime_ns, content_hash(path)]
+
+
+def dataset_hash(paths, labels, categories, fingerprints=None):
+    """
+    Görsel yolları, etiketleri ve içerik özetlerinden kararlı bir özet üret.
+    fingerprints: path -> file_fingerprint; aynı yolda değiştirilen görsel de özeti
+    değiştirir. Sadece içerik özeti kullanılır (mtime kopyalama / deploy ile değişir).
+    """
+    fingerprints = fingerprints or {}
+    digest = hashlib.sha256()
+    for path, label in sorted(zip(paths, (categories[i] for i in labels))):
+        fingerprint = fingerprints.get(path)
+        content = fingerprint[2] if fingerprint else ""
+        digest.update(f"{path}\t{label}\t{content}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """
+    Diskte sürümlü feature deposu:
+        vectors.f32   -> ham float32 matris (count x dim, L2 normalize)
+        labels.npy    -> kategori id dizisi
+        manifest.json -> sürüm, model, ön işleme, dataset özeti, kategoriler, yollar
+
+    open() vektörleri np.memmap ile açar; aynı dosyayı açan worker'lar
+    aynı fiziksel sayfaları paylaşır.
+    """
+
+    def __init__(self, vectors, labels, categories, paths, model_id, preprocessing, extra=None):
+        self.vectors = vectors
+        self.labels = labels
+        self.categories = list(categories)
+        self.paths = list(paths)
+        self.model_id = model_id
+        self.preprocessing = preprocessing
+        self.extra = extra or {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def dim(self):
+        return int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0
+
+    @property
+    def dataset_hash(self):
+        return dataset_hash(self.paths, self.labels, self.categories, self.extra.get('fingerprints'))
+
+    @classmethod
+    def from_features(cls, features_cache, model_id, preprocessing, extra=None):
+        """{path: {'features', 'category'}} sözlüğünden depo oluştur"""
+        categories = []
+        name_to_id = {}
+        vectors = []
+        labels = []
+        paths = []
+
+        for img_path, data in features_cache.items():
+            if data['features'] is None:
+                continue
+
+            category = data['category']
+            if category not in name_to_id:
+                name_to_id[category] = len(categories)
+                categories.append(category)
+
+            vectors.append(np.asarray(data['features'], dtype=np.float32).ravel())
+            labels.append(name_to_id[category])
+            paths.append(img_path)
+
+        if vectors:
+            matrix = normalize_rows(np.stack(vectors))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+
+        return cls(matrix, np.asarray(labels, dtype=np.int16), categories, paths,
+                   model_id, preprocessing, extra)
+
+    def manifest(self):
+        return {
+            'version': STORE_VERSION,
+            'model_id': self.model_id,
+            'preprocessing': self.preprocessing,
+            'dataset_hash': self.dataset_hash,
+            'count': len(self),
+            'dim': self.dim,
+            'dtype': 'float32',
+            'normalized': True,
+            'categories': self.categories,
+            'paths': self.paths,
+            **self.extra,
+        }
+
+    def save(self, directory):
+        """Depoyu geçici klasöre yaz, sonra eski klasörün yerine taşı"""
+        directory = Path(directory)
+        tmp_dir = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+        old_dir = directory.with_name(f"{directory.name}.old-{os.getpid()}")
+
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        try:
+            np.ascontiguousarray(self.vectors, dtype=np.float32).tofile(tmp_dir / VECTORS_FILE)
+            np.save(tmp_dir / LABELS_FILE, np.asarray(self.labels, dtype=np.int16))
+            with open(tmp_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest(), f, ensure_ascii=False)
+
+            if directory.exists():
+                directory.rename(old_dir)
+            tmp_dir.rename(directory)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if old_dir.exists() and not directory.exists():
+                old_dir.rename(directory)
+            raise
+
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def open(cls, directory, mmap=True):
+        """Depoyu aç; mmap=True ise vektörler bellek eşlemeli (salt okunur) gelir"""
+        directory = Path(directory)
+        with open(directory / MANIFEST_FILE, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"Desteklenmeyen feature store sürümü: {manifest.get('version')}")
+
+        count, dim = manifest['count'], manifest['dim']
+        vectors_path = directory / VECTORS_FILE
+        expected_size = count * dim * 4
+        if vectors_path.stat().st_size != expected_size:
+            raise ValueError(f"{vectors_path} boyutu manifest ile uyuşmuyor")
+
+        if count == 0:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        elif mmap:
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(count, dim))
+        else:
+            vectors = np.fromfile(vectors_path, dtype=np.float32).reshape(count, dim)
+
+        labels = np.load(directory / LABELS_FILE, mmap_mode='r' if mmap else None)
+
+        known = {'version', 'model_id', 'preprocessing', 'dataset_hash', 'count', 'dim',
+                 'dtype', 'normalized', 'categories', 'paths'}
+        extra = {k: v for k, v in manifest.items() if k not in known}
+
+        store = cls(vectors, labels, manifest['categories'], manifest['paths'],
+                    manifest['model_id'], manifest['preprocessing'], extra)
+        if manifest.get('dataset_hash') != store.dataset_hash:
+            raise ValueError("Manifest dataset özeti içerikle uyuşmuyor")
+        return store
+
+
+def load_legacy_pickle(pkl_path, model_id, preprocessing):
+    """Eski features.pkl dosyasını FeatureStore'a çevir"""
+    with open(pkl_path, 'rb') as f:
+        data = pickle.load(f)
+    return FeatureStore.from_features(data['features'], model_id, preprocessing)
+
+
+def migrate_legacy_pickle(pkl_path, store_dir, model_id, preprocessing):
+    """features.pkl'i yeni formata yaz ve memmap ile aç"""
+    store = load_legacy_pickle(pkl_path, model_id, preprocessing)
+    store.save(store_dir)
+    return FeatureStore.open(store_dir)
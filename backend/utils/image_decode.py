@@ -0,0 +1,56 @@
+import io
+
+from PIL import Image, ImageOps
+
+EXIF_ORIENTATION = 0x0112
+# Görseli 90° döndüren EXIF yönleri (decode edilen genişlik / yükseklik yer değiştirir)
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+# Ham piksel upload'larının içerik tipi (bkz. RawRGB, WasteDetector.input_spec).
+# application/octet-stream değil: istemciler tipi belirsiz dosyaları (JPEG/PNG dahil)
+# onunla gönderir, bunlar ham piksel sanılmamalı
+RAW_CONTENT_TYPE = "application/x-ecoscan-rgb"
+
+
+class RawRGB(bytes):
+    """
+    Decode gerektirmeyen ham upload: satır satır (yükseklik, genişlik, 3) uint8 RGB.
+    bytes olduğu için içerik hash'i ile sonuç önbelleğine girer.
+    """
+
+    def __new__(cls, data, width, height):
+        if len(data) != width * height * 3:
+            raise ValueError(f"{width}x{height}x3 = {width * height * 3} byte bekleniyordu, "
+                             f"{len(data)} byte geldi")
+        raw = super().__new__(cls, data)
+        raw.size = (width, height)
+        return raw
+
+
+def load_image(image, size=None):
+    """
+    Dosya yolu, bytes, dosya benzeri nesne veya PIL görselini RGB PIL görseline çevir.
+
+    size: (genişlik, yükseklik) verilirse JPEG'ler DCT ölçeklemesiyle (draft) decode
+    edilir; sonuç iki kenarda da size'dan küçük olmayan en küçük 1/1, 1/2, 1/4 ya da
+    1/8 boyuttur. 12 MP'lik bir telefon fotoğrafı tam çözünürlükte açılmaz; son
+    yeniden boyutlandırma yine Preprocess'te yapılır. Diğer formatlar tam decode edilir.
+    EXIF yönü her durumda uygulanır (telefonlar dik fotoğrafları yan kaydedip etiketler).
+    """
+    if isinstance(image, Image.Image):
+        return image.convert('RGB')
+    if isinstance(image, RawRGB):
+        # Kopyasız görünüm; model boyutundaysa Preprocess yeniden örneklemez
+        return Image.frombuffer('RGB', image.size, image, 'raw', 'RGB', 0, 1)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = io.BytesIO(image)
+    img = Image.open(image)
+
+    orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+    if size is not None and img.format == "JPEG":
+        width, height = size
+        if orientation in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        img.draft('RGB', (width, height))
+    if orientation != 1:
+        img = ImageOps.exif_transpose(img)
+    return img.convert('RGB')
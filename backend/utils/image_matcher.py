@@ -1,130 +1,52 @@
-import cv2
-import numpy as np
-from pathlib import Path
+import logging
 from collections import defaultdict
-import torch
-import torchvision.models as models
-import torchvision.transforms as transforms
-from PIL import Image
+from utils.embedding_engine import EmbeddingEngine
+from utils.inference_backends import DEFAULT_BACKBONE
+from utils.waste_detector import WASTE_INFO
+
+logger = logging.getLogger(__name__)
 
 class ImageMatcher:
-    def __init__(self, dataset_path="dataset"):
+    def __init__(self, dataset_path="dataset", index_type="exact", index_params=None,
+                 max_per_category=200, batch_size=32, num_workers=None, backend="torch",
+                 backbone=DEFAULT_BACKBONE, store_path=None):
         """
         Deep Learning tabanlı görsel benzerlik sınıflandırıcı
-        """
-        self.dataset_path = Path(dataset_path)
-        self.features_cache = {}
-        self.categories = []
-        
-        # ResNet50 model yükle (pretrained)
-        print("🔄 ResNet50 modeli yükleniyor...")
-        self.resnet = models.resnet50(pretrained=True)
-        # Son katmanı çıkar (feature extraction için)
-        self.resnet = torch.nn.Sequential(*list(self.resnet.children())[:-1])
-        self.resnet.eval()
-        
-        # Görsel ön işleme
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
-            )
-        ])
-        
-        print("🔄 Dataset yükleniyor...")
-        self._load_dataset()
-        print(f"✅ {len(self.features_cache)} görsel yüklendi")
-    
-    def _extract_features(self, image_path):
-        """ResNet50 ile derin özellikler çıkar"""
-        try:
-            img = Image.open(image_path).convert('RGB')
-            img_tensor = self.transform(img).unsqueeze(0)
-            
-            with torch.no_grad():
-                features = self.resnet(img_tensor)
-                features = features.flatten().numpy()
-            
-            return features
-        except Exception as e:
-            return None
-    
-    def _load_dataset(self):
-        """Dataset'teki tüm görselleri yükle ve feature'ları çıkar"""
-        if not self.dataset_path.exists():
-            print(f"⚠️ Dataset klasörü bulunamadı: {self.dataset_path}")
-            return
         
-        for category_folder in self.dataset_path.iterdir():
-            if not category_folder.is_dir():
-                continue
-            
-            category = category_folder.name.lower()
-            self.categories.append(category)
-            
-            image_files = (list(category_folder.glob("*.jpg")) + 
-                          list(category_folder.glob("*.png")) + 
-                          list(category_folder.glob("*.jpeg")))
-            
-            print(f"  📂 {category}: {len(image_files)} görsel")
-            
-            # Her kategoriden max 200 görsel yükle
-            for img_path in image_files[:200]:
-                try:
-                    features = self._extract_features(str(img_path))
-                    if features is not None:
-                        self.features_cache[str(img_path)] = {
-                            'features': features,
-                            'category': category
-                        }
-                except Exception as e:
-                    pass  # Sessizce atla
+        Model, feature store ve indeks WasteDetector ile aynı EmbeddingEngine'den gelir:
+        aynı ayarlarla oluşturulurlarsa süreçte tek kopya yüklenir.
+        """
+        self.engine = EmbeddingEngine.shared(
+            dataset_path=dataset_path, index_type=index_type, index_params=index_params,
+            store_path=store_path, max_per_category=max_per_category, batch_size=batch_size,
+            num_workers=num_workers, backend=backend, backbone=backbone,
+            known_categories=set(WASTE_INFO)
+        )
+        self.engine.load()
+        logger.info(f"✅ {len(self.engine.feature_matrix)} görsel yüklendi")
     
-    def _cosine_similarity(self, vec1, vec2):
-        """İki vektör arasındaki cosine benzerliği"""
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0
-        
-        return dot_product / (norm1 * norm2)
+    @property
+    def categories(self):
+        return self.engine.categories
     
     def find_similar(self, query_image_path, top_k=10):
         """
         En benzer görselleri bul (Cosine Similarity)
         """
-        query_features = self._extract_features(query_image_path)
+        query_features = self.engine.extract_features_many([query_image_path], label="matcher")[0]
         
-        if query_features is None or len(self.features_cache) == 0:
+        if query_features is None or not self.engine.is_loaded():
             return None
         
-        # Her dataset görseli ile karşılaştır
-        similarities = []
-        
-        for img_path, data in self.features_cache.items():
-            dataset_features = data['features']
-            
-            if dataset_features is None:
-                continue
-            
-            # Cosine similarity hesapla
-            similarity = self._cosine_similarity(query_features, dataset_features)
-            
-            similarities.append({
-                'path': img_path,
-                'category': data['category'],
-                'score': similarity,  # 0-1 arası değer
-                'similarity': similarity
-            })
-        
-        # Similarity'ye göre sırala (büyükten küçüğe)
-        similarities.sort(key=lambda x: x['score'], reverse=True)
-        
-        return similarities[:top_k]
+        return [
+            {
+                'path': sim['path'],
+                'category': sim['category'],
+                'score': sim['similarity'],  # 0-1 arası değer
+                'similarity': sim['similarity']
+            }
+            for sim in self.engine.search_many([query_features], top_k)[0]
+        ]
     
     def classify(self, image_path):
         """
@@ -0,0 +1,197 @@
+"""
+Görsel feature extractor'ları (son sınıflandırma katmanı çıkarılmış
+torchvision omurgaları) ve çalışma zamanı seçenekleri.
+
+Omurgalar (BACKBONES):
+    resnet50           -> 2048 boyut (varsayılan)
+    resnet18           -> 512 boyut
+    mobilenet_v3_large -> 960 boyut
+    mobilenet_v3_small -> 576 boyut
+    efficientnet_b0    -> 1280 boyut
+
+Backend'ler:
+    torch       -> eager PyTorch (torchvision modeli)
+    torchscript -> export_model.py ile üretilen .ts dosyası
+    onnx        -> export_model.py ile üretilen .onnx dosyası (onnxruntime)
+    int8        -> export_model.py ile statik olarak quantize edilmiş TorchScript
+                   (dataset ile kalibre edilir; kendi feature store'unu kullanır)
+
+Tüm backend'ler (N, 3, H, W) float32 batch alır, (N, D) numpy matris döndürür.
+"""
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+DEFAULT_BACKBONE = "resnet50"
+
+# isim -> (torchvision yapıcısı, embedding boyutu)
+BACKBONES = {
+    'resnet50': ("resnet50", 2048),
+    'resnet18': ("resnet18", 512),
+    'mobilenet_v3_large': ("mobilenet_v3_large", 960),
+    'mobilenet_v3_small': ("mobilenet_v3_small", 576),
+    'efficientnet_b0': ("efficientnet_b0", 1280),
+}
+
+# Export formatı -> dosya soneki (models/<omurga>_features<sonek>)
+EXPORT_SUFFIXES = {
+    'torchscript': ".ts",
+    'onnx': ".onnx",
+    'int8': "_int8.ts",
+}
+
+
+def default_export_path(fmt, backbone=DEFAULT_BACKBONE):
+    """export_model.py'nin varsayılan çıktı yolu"""
+    return Path("models") / f"{backbone}_features{EXPORT_SUFFIXES[fmt]}"
+
+
+class Preprocess:
+    """
+    PIL görseli -> normalize edilmiş (3, H, W) float32 dizi.
+    torchvision Resize + ToTensor + Normalize ile aynı sonucu verir,
+    ama torchvision gerektirmez.
+    """
+
+    def __init__(self, size=(224, 224), mean=IMAGENET_MEAN, std=IMAGENET_STD):
+        self.size = tuple(size)
+        self.mean = np.asarray(mean, dtype=np.float32).reshape(3, 1, 1)
+        self.std = np.asarray(std, dtype=np.float32).reshape(3, 1, 1)
+
+    def __call__(self, img):
+        # Resize((h, w)) -> PIL boyutu (w, h); model boyutunda gelen görsel (ham piksel
+        # upload'u, istemcide küçültülmüş görsel) yeniden örneklenmez
+        if img.size != (self.size[1], self.size[0]):
+            img = img.resize((self.size[1], self.size[0]), Image.BILINEAR)
+        array = np.asarray(img, dtype=np.float32).transpose(2, 0, 1) / 255.0
+        return (array - self.mean) / self.std
+
+
+def check_backbone(name):
+    if name not in BACKBONES:
+        raise ValueError(f"Bilinmeyen omurga: {name} (seçenekler: {', '.join(BACKBONES)})")
+    return name
+
+
+def build_backbone(name=DEFAULT_BACKBONE):
+    """Sınıflandırıcısı çıkarılmış, eval modunda pretrained omurga"""
+    import torch
+    import torchvision.models as models
+
+    constructor, _ = BACKBONES[check_backbone(name)]
+    model = getattr(models, constructor)(pretrained=True)
+
+    if name.startswith("resnet"):
+        # Son katmanı (fc) çıkar; avgpool çıkışı (N, D, 1, 1)
+        backbone = torch.nn.Sequential(*list(model.children())[:-1])
+    else:
+        # MobileNetV3 / EfficientNet: features + avgpool, classifier atılır
+        backbone = torch.nn.Sequential(model.features, model.avgpool)
+    backbone.eval()
+    return backbone
+
+
+def quantized_engine():
+    """Bu CPU için uygun quantized kernel motoru (x86/fbgemm, ARM'da qnnpack)"""
+    import torch
+
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            return engine
+    raise RuntimeError("Bu PyTorch kurulumu quantized inference desteklemiyor")
+
+
+class TorchBackend:
+    name = "torch"
+    # Float modelden farklı embedding üreten backend'ler ayrı feature store kullanır
+    variant = None
+
+    def __init__(self, model=None, backbone=DEFAULT_BACKBONE, threads=None):
+        import torch
+
+        if threads:
+            # Süreç geneli; birden çok worker'da çekirdekler paylaştırılır
+            torch.set_num_threads(threads)
+        self._torch = torch
+        self.model = model if model is not None else build_backbone(backbone)
+
+    def __call__(self, batch):
+        with self._torch.inference_mode():
+            features = self.model(self._torch.as_tensor(np.asarray(batch, dtype=np.float32)))
+        return features.flatten(1).numpy()
+
+
+class TorchScriptBackend(TorchBackend):
+    name = "torchscript"
+
+    def __init__(self, path=None, backbone=DEFAULT_BACKBONE, threads=None):
+        import torch
+
+        path = Path(path or default_export_path(self.name, backbone))
+        model = torch.jit.load(str(path), map_location="cpu")
+        model.eval()
+        super().__init__(model, threads=threads)
+
+
+class Int8Backend(TorchScriptBackend):
+    name = "int8"
+    variant = "int8"
+
+    def __init__(self, path=None, backbone=DEFAULT_BACKBONE, threads=None):
+        import torch
+
+        # Paketlenmiş ağırlıklar export sırasındaki motorla eşleşmeli
+        torch.backends.quantized.engine = quantized_engine()
+        super().__init__(path, backbone, threads)
+
+
+class OnnxBackend:
+    name = "onnx"
+    variant = None
+
+    def __init__(self, path=None, backbone=DEFAULT_BACKBONE, threads=None):
+        import onnxruntime as ort
+
+        path = Path(path or default_export_path(self.name, backbone))
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            # threads=1: thread havuzu kurulmaz, oturum fork sonrası da güvenle kullanılır
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        batch = np.ascontiguousarray(np.asarray(batch, dtype=np.float32))
+        features = self.session.run(None, {self.input_name: batch})[0]
+        return features.reshape(len(batch), -1)
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    TorchScriptBackend.name: TorchScriptBackend,
+    OnnxBackend.name: OnnxBackend,
+    Int8Backend.name: Int8Backend,
+}
+
+
+def backend_variant(name):
+    """Backend'in feature store varyantı (float modelle aynı embedding'ler için None)"""
+    if name not in BACKENDS:
+        raise ValueError(f"Bilinmeyen backend: {name} (seçenekler: {', '.join(BACKENDS)})")
+    return BACKENDS[name].variant
+
+
+def create_backend(name="torch", path=None, backbone=DEFAULT_BACKBONE, threads=None):
+    """İsme göre inference backend'i oluştur (threads: intra-op thread sayısı, None = varsayılan)"""
+    backend_variant(name)
+    check_backbone(backbone)
+    if name == TorchBackend.name:
+        return TorchBackend(backbone=backbone, threads=threads)
+    return BACKENDS[name](path, backbone, threads)
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from utils.vector_index import normalize_rows
+
+
+class LinearHead:
+    """
+    Donmuş omurga embedding'leri üzerinde softmax sınıflandırma başlığı
+    (train_head.py ile eğitilir). Servis sadece numpy ile yapılır:
+    doğrusal başlıkta tek matris çarpımı + softmax, MLP'de araya bir ReLU katmanı.
+
+    temperature: validation setinde NLL'i en aza indiren sıcaklık (kalibrasyon);
+    olasılıklar softmax(logit / temperature) ile hesaplanır.
+    """
+
+    def __init__(self, layers, categories, temperature=1.0, model_id=None, dataset_hash=None):
+        self.layers = [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32))
+                       for w, b in layers]
+        self.categories = list(categories)
+        self.temperature = float(temperature)
+        self.model_id = model_id
+        self.dataset_hash = dataset_hash
+
+    @property
+    def dim(self):
+        return self.layers[0][0].shape[0]
+
+    def logits(self, features):
+        x = normalize_rows(np.asarray(features, dtype=np.float32))
+        for weight, bias in self.layers[:-1]:
+            x = np.maximum(x @ weight + bias, 0.0)
+        weight, bias = self.layers[-1]
+        return x @ weight + bias
+
+    def predict_proba(self, features):
+        """(N, C) kalibre olasılıklar; sütunlar self.categories sırasında"""
+        scaled = self.logits(features) / self.temperature
+        scaled -= scaled.max(axis=1, keepdims=True)
+        exp = np.exp(scaled)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def memory_bytes(self):
+        return sum(w.nbytes + b.nbytes for w, b in self.layers)
+
+    def save(self, path):
+        meta = {
+            "categories": self.categories,
+            "temperature": self.temperature,
+            "model_id": self.model_id,
+            "dataset_hash": self.dataset_hash,
+            "layers": len(self.layers),
+        }
+        arrays = {}
+        for i, (weight, bias) in enumerate(self.layers):
+            arrays[f"w{i}"] = weight
+            arrays[f"b{i}"] = bias
+        np.savez(Path(path), meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(Path(path), allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            layers = [(data[f"w{i}"], data[f"b{i}"]) for i in range(meta["layers"])]
+        return cls(layers, meta["categories"], meta["temperature"], meta["model_id"],
+                   meta["dataset_hash"])
@@ -0,0 +1,121 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Aşama süreleri için kova sınırları (saniye): 0.5 ms ... 10 sn
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Prometheus histogramı: etiket değeri başına kümülatif kova sayaçları, toplam ve
+    gözlem sayısı. Thread-safe; observe() kilit altında birkaç toplama yapar.
+    """
+
+    def __init__(self, name, documentation, label="stage", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # etiket değeri -> [kova sayaçları, toplam, sayı]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, label_value):
+        """Blok süresini saniye olarak gözlemle"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, label_value)
+
+    def snapshot(self):
+        """etiket değeri -> (kova sayaçları, toplam, sayı) kopyası"""
+        with self._lock:
+            return {key: (list(counts), total, count)
+                    for key, (counts, total, count) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            for bound, value in zip(self.buckets + (float("inf"),), counts + [count]):
+                labels = format_labels({self.label: key, "le": format_value(float(bound))})
+                lines.append(f"{self.name}_bucket{labels} {value}")
+            labels = format_labels({self.label: key})
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Etiket kombinasyonu başına artan sayaç"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{format_labels(dict(zip(self.labelnames, key)))} {value}")
+        return "\n".join(lines)
+
+
+def render_samples(name, documentation, kind, samples):
+    """Scrape anında hesaplanan değerler; samples: [(etiketler, değer), ...]"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+    return "\n".join(lines)
+
+
+# Süreç geneli ölçümler (gunicorn ile her worker kendi değerlerini raporlar)
+STAGE_SECONDS = Histogram(
+    "ecoscan_stage_seconds",
+    "Tespit aşamalarının süresi (inference / search / centroid / head batch başına, diğerleri görsel başına)"
+)
+BATCH_SIZE = Histogram(
+    "ecoscan_batch_size", "Tek forward pass'te işlenen görsel sayısı", label="engine",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+HTTP_REQUESTS = Counter(
+    "ecoscan_http_requests_total", "Endpoint ve durum koduna göre HTTP istekleri", ("endpoint", "status")
+)
+HTTP_SECONDS = Histogram(
+    "ecoscan_http_request_seconds", "Endpoint başına istek süresi", label="endpoint"
+)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+# Sözlük/anahtar başına yaklaşık Python nesne maliyeti (byte)
+ENTRY_OVERHEAD = 400
+
+
+def content_key(data):
+    """Upload içeriğinin sha256 özeti"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash(img, size=8):
+    """64 bitlik fark hash'i (difference hash); benzer kareler küçük Hamming mesafesi verir"""
+    gray = img.convert('L').resize((size + 1, size), Image.BILINEAR)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+class ResultCache:
+    """
+    Tespit sonuçları için LRU + TTL önbellek.
+
+    1. seviye: içerik hash'i (byte-byte aynı upload)
+    2. seviye (opsiyonel): perceptual hash, Hamming mesafesi <= phash_distance
+       olan neredeyse aynı kareler
+
+    max_bytes aşıldığında en eski kullanılan girdiler atılır. namespace
+    değiştiğinde (feature store / model değişimi) önbellek boşaltılır.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl_seconds=3600, use_phash=False,
+                 phash_distance=4):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.use_phash = use_phash
+        self.phash_distance = phash_distance
+        self.namespace = None
+
+        self._entries = OrderedDict()   # key -> (sonuç, boyut, zaman, phash)
+        self._phashes = OrderedDict()   # phash -> key
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.phash_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def set_namespace(self, namespace):
+        """Model/feature store kimliği değiştiyse önbelleği geçersiz kıl"""
+        with self._lock:
+            if namespace != self.namespace:
+                self._clear_locked()
+                self.namespace = namespace
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self):
+        self._entries.clear()
+        self._phashes.clear()
+        self._bytes = 0
+
+    def _drop_locked(self, key):
+        result, size, _, phash = self._entries.pop(key)
+        self._bytes -= size
+        if phash is not None and self._phashes.get(phash) == key:
+            del self._phashes[phash]
+
+    def _expired(self, created):
+        return self.ttl_seconds is not None and time.monotonic() - created > self.ttl_seconds
+
+    def _lookup_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[2]):
+            self._drop_locked(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, key):
+        """İçerik hash'i ile ara"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._lookup_locked(key)
+            if result is not None:
+                self.hits += 1
+            return dict(result) if result is not None else None
+
+    def get_similar(self, phash):
+        """Perceptual hash ile en yakın girdiyi ara"""
+        if not self.enabled or not self.use_phash:
+            return None
+        with self._lock:
+            best_key, best_distance = None, self.phash_distance + 1
+            for other, key in self._phashes.items():
+                distance = (other ^ phash).bit_count()
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                return None
+            result = self._lookup_locked(best_key)
+            if result is not None:
+                self.phash_hits += 1
+            return dict(result) if result is not None else None
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key, result, phash=None):
+        if not self.enabled:
+            return
+        size = ENTRY_OVERHEAD + len(key) + len(json.dumps(result, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+
+            self._entries[key] = (dict(result), size, time.monotonic(), phash)
+            self._bytes += size
+            if phash is not None:
+                self._phashes[phash] = key
+
+            # Bellek bütçesi aşıldıysa en eski kullanılanları at
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop_locked(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.phash_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "phash_hits": self.phash_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.phash_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,461 @@
+import json
+import numpy as np
+from collections import defaultdict
+from pathlib import Path
+
+
+def normalize_rows(matrix):
+    """Satırları L2 normuna böl (sıfır normlu satırlar sıfır kalır)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms)
+
+
+def _top_k(scores, ids, top_k):
+    """Skorlardan top-k seç; eşit skorlarda küçük id önce gelir"""
+    k = min(top_k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    if k < len(scores):
+        pos = np.argpartition(-scores, k - 1)[:k]
+    else:
+        pos = np.arange(len(scores))
+
+    # Eşit skorlarda ekleme sırasını koru
+    pos = pos[np.argsort(ids[pos], kind='stable')]
+    pos = pos[np.argsort(-scores[pos], kind='stable')]
+    return ids[pos], scores[pos]
+
+
+def vote(ids, scores, labels):
+    """
+    Top-k sonuçlarının benzerlik ağırlıklı kategori oylaması (WasteDetector.detect ile aynı);
+    labels: indeks sırasındaki kategori adları
+    """
+    votes = defaultdict(float)
+    for i, score in zip(ids, scores):
+        votes[labels[i]] += score
+    return max(votes, key=votes.get) if votes else None
+
+
+class ExactIndex:
+    """Brute-force cosine arama (tek matris-vektör çarpımı)"""
+
+    kind = "exact"
+
+    def __init__(self):
+        # Kurulumda istenen parametreler; dosyaya yazılır, yüklerken karşılaştırılır
+        self.params = {}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def build(self, vectors):
+        """Normalize edilmiş vektörlerden indeksi kur"""
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        return self
+
+    def search(self, query, top_k=20):
+        """Normalize edilmiş sorgu için (id'ler, skorlar) döndür"""
+        if len(self.vectors) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores = self.vectors @ np.asarray(query, dtype=np.float32)
+        return _top_k(scores, np.arange(len(scores)), top_k)
+
+    def search_batch(self, queries, top_k=20):
+        """Birden çok sorgu için tek matris-matris çarpımı; (id, skor) listesi döndürür"""
+        queries = np.asarray(queries, dtype=np.float32)
+        if len(self.vectors) == 0:
+            return [self.search(q, top_k) for q in queries]
+
+        scores = queries @ self.vectors.T
+        ids = np.arange(len(self.vectors))
+        return [_top_k(row, ids, top_k) for row in scores]
+
+    def memory_bytes(self):
+        """Sorgu sırasında okunan veri yapılarının boyutu (byte)"""
+        return self.vectors.nbytes
+
+    def _state(self):
+        return {}
+
+    def _set_state(self, state):
+        pass
+
+    def save(self, path, dataset_hash=""):
+        """
+        İndeks yapısını kaydet (vektörler feature store'da tutulur).
+        dataset_hash: indeksin kurulduğu store'un özeti; yüklerken karşılaştırılır.
+        """
+        state = self._state()
+        np.savez(path, kind=np.array(self.kind), count=np.array(len(self.vectors)),
+                 dataset_hash=np.array(dataset_hash), params=self._saved_params(), **state)
+
+    def _saved_params(self):
+        return np.array(json.dumps(self.params, sort_keys=True))
+
+    @staticmethod
+    def _read_params(data):
+        """Kayıtlı kurulum parametreleri (eski dosyalarda yok: None)"""
+        return json.loads(str(data['params'])) if 'params' in data.files else None
+
+    @staticmethod
+    def _check_saved(data, vectors, dataset_hash):
+        """Kayıtlı indeks verilen vektörler (ve store özeti) için mi kurulmuş?"""
+        if int(data['count']) != len(vectors):
+            raise ValueError(
+                f"İndeks {int(data['count'])} vektör için kurulmuş, {len(vectors)} verildi"
+            )
+        # Aynı sayıda ama farklı görseller (biri silinip biri eklenmiş) de eskimiş sayılır
+        if dataset_hash is not None:
+            saved = str(data['dataset_hash']) if 'dataset_hash' in data.files else ""
+            if saved != dataset_hash:
+                raise ValueError("İndeks farklı bir dataset ile kurulmuş")
+
+    def load_state(self, path, vectors, dataset_hash=None):
+        """Kaydedilmiş yapıyı verilen vektörlerle birlikte yükle"""
+        with np.load(path, allow_pickle=False) as data:
+            self._check_saved(data, vectors, dataset_hash)
+            self.params = self._read_params(data)
+            self._set_state({key: data[key] for key in data.files})
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        return self
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted file index: vektörler k-means kümelerine ayrılır,
+    sorguda sadece en yakın `nprobe` küme taranır
+    """
+
+    kind = "ivf"
+
+    def __init__(self, nlist=None, nprobe=8, iterations=20, seed=0):
+        super().__init__()
+        self.params = {'nlist': nlist, 'nprobe': nprobe, 'iterations': iterations, 'seed': seed}
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_ids = np.zeros(0, dtype=np.int64)
+
+    def _kmeans(self, vectors, nlist):
+        """Spherical k-means (cosine benzerliği ile)"""
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            counts = np.bincount(assign, minlength=nlist)
+
+            # Boş kalan kümeleri rastgele bir vektörle yeniden başlat
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+
+            new_centroids = normalize_rows(sums)
+            if np.allclose(new_centroids, centroids, atol=1e-6):
+                centroids = new_centroids
+                break
+            centroids = new_centroids
+
+        return centroids
+
+    def build(self, vectors):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        count = len(self.vectors)
+        if count == 0:
+            return self
+
+        nlist = self.nlist or max(1, int(np.sqrt(count)))
+        nlist = min(nlist, count)
+
+        self.centroids = self._kmeans(self.vectors, nlist)
+        assign = np.argmax(self.vectors @ self.centroids.T, axis=1)
+
+        # Kümeleri CSR biçiminde sakla: list_ids[offsets[c]:offsets[c+1]]
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=nlist)
+        self.list_ids = order.astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return self
+
+    def search(self, query, top_k=20):
+        if len(self.vectors) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidates = np.concatenate([
+            self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]]
+            for c in probe
+        ])
+        scores = self.vectors[candidates] @ query
+        return _top_k(scores, candidates, top_k)
+
+    def search_batch(self, queries, top_k=20):
+        # Her sorgu farklı kümelere baktığı için sorgu başına arama yapılır
+        return [self.search(q, top_k) for q in np.asarray(queries, dtype=np.float32)]
+
+    def memory_bytes(self):
+        return (self.vectors.nbytes + self.centroids.nbytes +
+                self.list_offsets.nbytes + self.list_ids.nbytes)
+
+    def _state(self):
+        return {
+            'nprobe': np.array(self.nprobe),
+            'centroids': self.centroids,
+            'list_offsets': self.list_offsets,
+            'list_ids': self.list_ids,
+        }
+
+    def _set_state(self, state):
+        self.nprobe = int(state['nprobe'])
+        self.centroids = state['centroids'].astype(np.float32)
+        self.list_offsets = state['list_offsets'].astype(np.int64)
+        self.list_ids = state['list_ids'].astype(np.int64)
+        self.nlist = len(self.centroids)
+
+
+class PCAIndex(ExactIndex):
+    """
+    PCA ile boyutu düşürülmüş vektörlerde arama.
+
+    x ≈ mean + componentsᵀ · y olduğundan q·x ≈ q·mean + (components · q)·y;
+    skorlar exact cosine'a yakın kalır (oylama ağırlıkları değişmez).
+    Sorgu sırasında sadece y (N x dim) ve projeksiyon tutulur; tam vektörler
+    feature store'da (memmap) kalır ve belleğe alınmaz.
+    """
+
+    kind = "pca"
+
+    def __init__(self, dim=256):
+        super().__init__()
+        self.params = {'dim': dim}
+        self.dim = dim
+        self.count = 0
+        self.mean = np.zeros(0, dtype=np.float32)
+        self.components = np.zeros((0, 0), dtype=np.float32)
+        self.projected = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return self.count
+
+    def _fit_projection(self, vectors):
+        """Ortalama ve ilk `dim` temel bileşen"""
+        self.mean = vectors.mean(axis=0).astype(np.float32)
+        centered = vectors - self.mean
+        dim = min(self.dim, *vectors.shape)
+
+        if len(vectors) > vectors.shape[1]:
+            # N > D: D x D kovaryans matrisinin özvektörleri SVD'den ucuz
+            eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+            components = eigenvectors[:, np.argsort(eigenvalues)[::-1][:dim]].T
+        else:
+            _, _, vt = np.linalg.svd(centered, full_matrices=False)
+            components = vt[:dim]
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+
+    def _project(self, vectors):
+        centered = np.asarray(vectors, dtype=np.float32) - self.mean
+        # Boş projeksiyon = birim matris (sadece merkezleme)
+        return centered @ self.components.T if self.components.size else centered
+
+    def _project_query(self, query):
+        return self.components @ query if self.components.size else query
+
+    def build(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.count = len(vectors)
+        if self.count == 0:
+            return self
+        self._fit_projection(vectors)
+        self.projected = np.ascontiguousarray(self._project(vectors))
+        return self
+
+    def _encoded_scores(self, projected_query):
+        return self.projected @ projected_query
+
+    def search(self, query, top_k=20):
+        if self.count == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        scores = float(query @ self.mean) + self._encoded_scores(self._project_query(query))
+        return _top_k(scores.astype(np.float32), np.arange(self.count), top_k)
+
+    def search_batch(self, queries, top_k=20):
+        return [self.search(q, top_k) for q in np.asarray(queries, dtype=np.float32)]
+
+    def memory_bytes(self):
+        return self.mean.nbytes + self.components.nbytes + self.projected.nbytes
+
+    def save(self, path, dataset_hash=""):
+        np.savez(path, kind=np.array(self.kind), count=np.array(self.count),
+                 dataset_hash=np.array(dataset_hash), params=self._saved_params(), **self._state())
+
+    def load_state(self, path, vectors, dataset_hash=None):
+        # Tam vektörler tutulmaz; sayı ve store özeti kontrol edilir
+        with np.load(path, allow_pickle=False) as data:
+            self._check_saved(data, vectors, dataset_hash)
+            self.count = int(data['count'])
+            self.params = self._read_params(data)
+            self._set_state({key: data[key] for key in data.files})
+        return self
+
+    def _state(self):
+        return {
+            'mean': self.mean,
+            'components': self.components,
+            'projected': self.projected,
+        }
+
+    def _set_state(self, state):
+        self.mean = state['mean'].astype(np.float32)
+        self.components = state['components'].astype(np.float32)
+        self.projected = state['projected'].astype(np.float32)
+        self.dim = len(self.components)
+
+
+class PQIndex(PCAIndex):
+    """
+    Product quantization: (isteğe bağlı PCA sonrası) vektör `m` alt uzaya
+    bölünür, her alt uzay 2^nbits merkezli bir kod kitabıyla tek byte'a
+    kodlanır. Sorguda asimetrik mesafe (ADC) kullanılır: sorgu sıkıştırılmaz,
+    her alt uzay için sorgu · merkez tablosu bir kez hesaplanıp kodlarla toplanır.
+
+    pca_dim=None ise PCA atlanır (sadece merkezleme yapılır).
+    """
+
+    kind = "pq"
+
+    def __init__(self, m=64, nbits=8, pca_dim=None, iterations=20, seed=0):
+        super().__init__(dim=pca_dim)
+        self.params = {'m': m, 'nbits': nbits, 'pca_dim': pca_dim, 'iterations': iterations, 'seed': seed}
+        self.m = m
+        self.nbits = nbits
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks = np.zeros((0, 0, 0), dtype=np.float32)
+        self.codes = np.zeros((0, 0), dtype=np.uint8)
+
+    def _fit_projection(self, vectors):
+        if self.dim:
+            super()._fit_projection(vectors)
+        else:
+            self.mean = vectors.mean(axis=0).astype(np.float32)
+            self.components = np.zeros((0, 0), dtype=np.float32)
+
+    def _kmeans(self, vectors, k, rng):
+        """Öklid k-means (alt uzay kod kitabı için)"""
+        centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+        for _ in range(self.iterations):
+            distances = ((vectors ** 2).sum(1)[:, None] - 2 * vectors @ centroids.T
+                         + (centroids ** 2).sum(1)[None, :])
+            assign = np.argmin(distances, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            counts = np.bincount(assign, minlength=k)
+
+            # Boş kalan merkezler eski yerinde kalır
+            filled = counts > 0
+            new_centroids = centroids.copy()
+            new_centroids[filled] = sums[filled] / counts[filled, None]
+            if np.allclose(new_centroids, centroids, atol=1e-6):
+                return new_centroids
+            centroids = new_centroids
+        return centroids
+
+    def _split(self, vectors):
+        """(N, D) -> (m, N, D/m) alt uzay görünümü"""
+        n, dim = vectors.shape
+        if dim % self.m:
+            raise ValueError(f"Boyut ({dim}) alt uzay sayısına (m={self.m}) tam bölünmüyor")
+        return vectors.reshape(n, self.m, dim // self.m).transpose(1, 0, 2)
+
+    def build(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.count = len(vectors)
+        if self.count == 0:
+            return self
+
+        self._fit_projection(vectors)
+        subspaces = self._split(self._project(vectors))
+        k = min(2 ** self.nbits, self.count)
+        rng = np.random.default_rng(self.seed)
+
+        codebooks = []
+        codes = np.empty((self.count, self.m), dtype=np.uint8 if k <= 256 else np.uint16)
+        for j, sub in enumerate(subspaces):
+            centroids = self._kmeans(np.ascontiguousarray(sub), k, rng)
+            distances = (sub ** 2).sum(1)[:, None] - 2 * sub @ centroids.T + (centroids ** 2).sum(1)[None, :]
+            codes[:, j] = np.argmin(distances, axis=1)
+            codebooks.append(centroids)
+
+        self.codebooks = np.stack(codebooks).astype(np.float32)
+        self.codes = codes
+        return self
+
+    def _encoded_scores(self, projected_query):
+        # ADC: her alt uzay için sorgu · merkez tablosu (m, k), kodlarla toplanır
+        sub_queries = projected_query.reshape(self.m, -1)
+        table = np.einsum('md,mkd->mk', sub_queries, self.codebooks)
+        return table[np.arange(self.m), self.codes].sum(axis=1)
+
+    def memory_bytes(self):
+        return self.mean.nbytes + self.components.nbytes + self.codebooks.nbytes + self.codes.nbytes
+
+    def _state(self):
+        return {
+            'mean': self.mean,
+            'components': self.components,
+            'codebooks': self.codebooks,
+            'codes': self.codes,
+        }
+
+    def _set_state(self, state):
+        self.mean = state['mean'].astype(np.float32)
+        self.components = state['components'].astype(np.float32)
+        self.codebooks = state['codebooks'].astype(np.float32)
+        self.codes = state['codes']
+        self.m = self.codebooks.shape[0]
+        self.dim = len(self.components) or None
+
+
+INDEX_TYPES = {
+    ExactIndex.kind: ExactIndex,
+    IVFIndex.kind: IVFIndex,
+    PCAIndex.kind: PCAIndex,
+    PQIndex.kind: PQIndex,
+}
+
+
+def create_index(kind="exact", **params):
+    """İsme göre boş bir indeks oluştur"""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Bilinmeyen indeks tipi: {kind} (seçenekler: {', '.join(INDEX_TYPES)})")
+    return INDEX_TYPES[kind](**params)
+
+
+def load_index(path, vectors, dataset_hash=None):
+    """
+    Kaydedilmiş indeksi yükle; tipi dosyadan okunur.
+    dataset_hash verilirse kayıtlı özetle aynı olmalı (değilse ValueError).
+    """
+    path = Path(path)
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data['kind'])
+    return create_index(kind).load_state(path, vectors, dataset_hash)
@@ -1,248 +1,445 @@
-import cv2
+import logging
+import threading
 import numpy as np
 from pathlib import Path
 from collections import defaultdict
-import torch
-import torchvision.models as models
-import torchvision.transforms as transforms
-from PIL import Image
+from utils.centroid_classifier import CentroidClassifier
+from utils.embedding_engine import EmbeddingEngine, describe_input
+from utils.image_decode import RAW_CONTENT_TYPE, load_image
+from utils.inference_backends import DEFAULT_BACKBONE, backend_variant, check_backbone
+from utils.linear_head import LinearHead
+from utils.metrics import BATCH_SIZE, STAGE_SECONDS
+from utils.result_cache import ResultCache, content_key, dhash
+from utils.vector_index import normalize_rows
+from utils.waste_info import WASTE_INFO, waste_types
+from utils.yolo_engine import YoloEngine
+
+logger = logging.getLogger(__name__)
 
 class WasteDetector:
-    def __init__(self, model_path="models/best.pt", dataset_path="dataset"):
+    # Omurga / store ayarları paylaşılan motorda (bkz. utils/embedding_engine.py)
+    MODEL_ID = EmbeddingEngine.MODEL_ID
+    PREPROCESSING = EmbeddingEngine.PREPROCESSING
+    model_id_for = staticmethod(EmbeddingEngine.model_id_for)
+    default_store_path = staticmethod(EmbeddingEngine.default_store_path)
+    ENGINES = ("knn", "head", "yolo")
+    
+    def __init__(self, model_path="models/best.pt", dataset_path="dataset",
+                 index_type="exact", index_params=None, store_path=None,
+                 legacy_cache_path="features.pkl", max_per_category=200, load_features=True,
+                 batch_size=32, num_workers=None, result_cache=None, backend="torch",
+                 backend_path=None, backbone=DEFAULT_BACKBONE, fast_path_margin=None,
+                 fast_path_temperature=0.02,
+                 prototypes_per_class=1, engine="knn", yolo_imgsz=640, yolo_conf=0.25,
+                 yolo_fuse=True, yolo_class_map=None, threads=None, head_path=None):
         """
         Deep Learning feature extraction ile atık tanıma
+        
+        engine: "knn" (omurga embedding'i + feature store benzerliği),
+            "head" (aynı embedding üzerinde eğitilmiş softmax başlığı, bkz. train_head.py) veya
+            "yolo" (model_path'teki Ultralytics modeli ile tek geçişte tespit)
+        head_path: engine="head" için başlık dosyası (varsayılan: default_head_path,
+            models/<omurga>_head.npz); yoksa ya da farklı bir model için eğitilmişse kNN kullanılır
+        model_path: engine="yolo" için YOLO ağırlıkları (train_yolo.py / download_model.py)
+        yolo_imgsz / yolo_conf / yolo_fuse: YOLO girdi boyutu, güven eşiği, Conv+BN birleştirme
+        yolo_class_map: YOLO sınıf adı -> atık türü eşlemesi (ör. {"biodegradable": "trash"})
+        index_type: "exact" (brute-force), "ivf" (yaklaşık, k-means kümeleri),
+            "pca" veya "pq" (sıkıştırılmış referans vektörleri, bkz. utils/vector_index.py)
+        store_path: memmap feature store klasörü (bkz. utils/feature_store.py);
+            varsayılan "feature_store", diğer omurga/quantize backend'lerde
+            "feature_store_<omurga>_<varyant>" (bkz. default_store_path)
+        legacy_cache_path: eski features.pkl; bulunursa store'a taşınır
+        max_per_category: dataset taranırken kategori başına en fazla görsel (None = hepsi)
+        load_features: False ise sadece model yüklenir (build_features.py gibi araçlar için)
+        batch_size / num_workers: dataset indekslenirken batch boyutu ve decode worker sayısı
+        result_cache: upload içerik hash'i ile sonuç önbelleği (varsayılan: 32 MB, 1 saat)
+        backend: "torch" (eager), "torchscript", "onnx" veya "int8" (bkz. export_model.py)
+        backend_path: export edilmiş model dosyası (varsayılan: models/<omurga>_features.*)
+        backbone: "resnet50", "resnet18", "mobilenet_v3_large", "mobilenet_v3_small"
+            veya "efficientnet_b0" (bkz. benchmark_backbones.py)
+        fast_path_margin: kategori prototipleriyle ilk iki kategori arasındaki cosine
+            farkı bu değerden büyükse top-20 kNN oylaması atlanır (None = kapalı; açmadan
+            önce benchmark_index.py --margins ile güncel store'da oy uyumunu kontrol edin)
+        fast_path_temperature: hızlı yolda güven = 0.60 + 0.35 * softmax(skorlar / T) payı.
+            Kategori skorları arasındaki cosine farkları küçük (0.01-0.1) olduğundan T de
+            küçüktür: T=0.02 ile 0.05'lik fark en fazla ~0.92, 0.1 ve üstü ~0.95 (üst sınır)
+            güven verir; güven daha yavaş doymalıysa T büyütülür
+        prototypes_per_class: hızlı yol için kategori başına prototip sayısı
+        threads: omurga forward'ının intra-op thread sayısı (None = kütüphane varsayılanı)
+        
+        Omurga, feature store ve indeks EmbeddingEngine.shared() ile alınır: aynı ayarlarla
+        oluşturulan dedektörler ve ImageMatcher süreç içinde tek kopyayı paylaşır.
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Bilinmeyen engine: {engine} (seçenekler: {', '.join(self.ENGINES)})")
+        self.engine = engine
+        self.model_path = Path(model_path)
+        self.yolo = None
+        self.head = None
+        self.embedder = None
         self.dataset_path = Path(dataset_path)
-        self.features_cache = {}
-        self.categories = []
-        
-        # ResNet50 model yükle (pretrained)
-        print("🔄 ResNet50 modeli yükleniyor...")
-        self.resnet = models.resnet50(pretrained=True)
-        # Son katmanı çıkar (feature extraction için)
-        self.resnet = torch.nn.Sequential(*list(self.resnet.children())[:-1])
-        self.resnet.eval()
-        
-        # Görsel ön işleme
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
+        self.index_type = index_type
+        
+        # Farklı omurga / quantize model farklı embedding üretir: ayrı model kimliği ve ayrı store
+        self.backbone = check_backbone(backbone)
+        self.backend = backend
+        self.model_id = self.model_id_for(backbone, backend)
+        self.store_path = Path(store_path or self.default_store_path(backbone, backend))
+        self.head_path = Path(head_path or self.default_head_path(backbone, backend))
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        
+        # İki aşamalı sınıflandırma: önce kategori prototipleri, belirsizse kNN
+        self.fast_path_margin = fast_path_margin
+        self.fast_path_temperature = fast_path_temperature
+        self.centroids = CentroidClassifier(prototypes=prototypes_per_class)
+        self.path_counts = {'centroid': 0, 'knn': 0, 'head': 0, 'yolo': 0}
+        self._stats_lock = threading.Lock()
+        
+        self.waste_info = WASTE_INFO
+        # Önbellek (phash) için decode edilen görsel modele de verilir: aynı boyutta açılmalı
+        self.decode_size = None
+        
+        if engine == "yolo":
+            # YOLO feature store kullanmaz; model bir kez yüklenip ısıtılır
+            logger.info(f"🔄 YOLO modeli yükleniyor: {self.model_path} (imgsz={yolo_imgsz})...")
+            self.yolo = YoloEngine(
+                self.model_path, imgsz=yolo_imgsz, conf=yolo_conf, fuse=yolo_fuse,
+                class_map=yolo_class_map, known_categories=set(self.waste_info)
             )
-        ])
-        
-        # Atık türü bilgileri
-        self.waste_info = {
-            'plastic': {
-                'name_tr': 'Plastik',
-                'bin_type': 'Sarı Kutu',
-                'bin_color': '#FFEB3B',
-                'recyclable': True,
-                'points': 10,
-                'icon': '♻️'
-            },
-            'glass': {
-                'name_tr': 'Cam',
-                'bin_type': 'Yeşil Kutu',
-                'bin_color': '#4CAF50',
-                'recyclable': True,
-                'points': 15,
-                'icon': '🫙'
-            },
-            'metal': {
-                'name_tr': 'Metal',
-                'bin_type': 'Gri Kutu',
-                'bin_color': '#9E9E9E',
-                'recyclable': True,
-                'points': 12,
-                'icon': '🥫'
-            },
-            'paper': {
-                'name_tr': 'Kağıt',
-                'bin_type': 'Mavi Kutu',
-                'bin_color': '#2196F3',
-                'recyclable': True,
-                'points': 8,
-                'icon': '📄'
-            },
-            'cardboard': {
-                'name_tr': 'Karton',
-                'bin_type': 'Mavi Kutu',
-                'bin_color': '#2196F3',
-                'recyclable': True,
-                'points': 10,
-                'icon': '📦'
-            },
-            'trash': {
-                'name_tr': 'Diğer Atık',
-                'bin_type': 'Siyah Kutu',
-                'bin_color': '#424242',
-                'recyclable': False,
-                'points': 5,
-                'icon': '🗑️'
-            },
-            'textile': {
-                'name_tr': 'Tekstil',
-                'bin_type': 'Giysi Kumbarası',
-                'bin_color': '#E91E63',
-                'recyclable': True,
-                'points': 20,
-                'icon': '👕'
-            }
-        }
+            self.result_cache.set_namespace(self.yolo.model_id)
+            logger.info(f"✅ YOLO hazır ({self.yolo.task}, {len(self.yolo.names)} sınıf)")
+            return
         
-        # Cache dosyası kontrolü
-        import pickle
-        cache_file = Path("features.pkl")
+        # Feature extractor + feature store + indeks (süreç başına bir kopya)
+        self.embedder = EmbeddingEngine.shared(
+            dataset_path=dataset_path, index_type=index_type, index_params=index_params,
+            store_path=self.store_path, legacy_cache_path=legacy_cache_path,
+            max_per_category=max_per_category, batch_size=batch_size, num_workers=num_workers,
+            backend=backend, backend_path=backend_path, backbone=backbone, threads=threads,
+            known_categories=set(self.waste_info)
+        )
         
-        if cache_file.exists():
-            print(f"🚀 Cache dosyası bulundu: {cache_file}")
-            try:
-                with open(cache_file, 'rb') as f:
-                    data = pickle.load(f)
-                    self.features_cache = data['features']
-                    self.categories = data['categories']
-                print(f"✅ {len(self.features_cache)} görsel yüklendi (Cache)")
-            except Exception as e:
-                print(f"⚠️ Cache okuma hatası: {e}")
-                print("🔄 Dataset taranıyor...")
-                self._load_dataset()
-        else:
-            print("🔄 Dataset taranıyor (Cache bulunamadı)...")
-            self._load_dataset()
-
-    def save_features(self, path):
-        """Özellikleri dosyaya kaydet"""
-        import pickle
-        try:
-            data = {
-                'features': self.features_cache,
-                'categories': self.categories
-            }
-            with open(path, 'wb') as f:
-                pickle.dump(data, f)
-            print(f"✅ Özellikler kaydedildi: {path}")
-            return True
-        except Exception as e:
-            print(f"❌ Kayıt hatası: {e}")
-            return False
+        self.decode_size = self.embedder.decode_size
+        
+        if not load_features:
+            return
+        
+        self._attach_store(self.embedder.load())
+    
+    @staticmethod
+    def default_head_path(backbone=DEFAULT_BACKBONE, backend="torch"):
+        """
+        "models/<omurga>[_<varyant>]_head.npz". Başlık store klasörünün dışında tutulur:
+        build_features.py store'u yeni klasöre yazıp eskisini sildiğinde başlık kalır
+        (model ve dataset uyumu başlık dosyasındaki model_id / dataset_hash ile kontrol edilir)
+        """
+        parts = [check_backbone(backbone)]
+        variant = backend_variant(backend)
+        if variant:
+            parts.append(variant)
+        return Path("models") / f"{'_'.join(parts)}_head.npz"
+    
+    def _attach_store(self, store):
+        """Paylaşılan store için bu dedektörün önbellek alanını ve sınıflandırıcılarını hazırla"""
+        # Feature store veya model değiştiyse eski sonuçlar geçersiz
+        self.result_cache.set_namespace(f"{self.model_id}:{store.dataset_hash}:{self.index_type}")
+        
+        if self.engine == "head":
+            self.head = self._load_head(store)
+        
+        if self.fast_path_margin is not None and self.head is None:
+            self.centroids.build(self.embedder.feature_matrix, self.embedder.label_ids,
+                                 len(self.embedder.label_names))
+            logger.info(f"🎯 Hızlı yol: {len(self.centroids)} prototip (margin >= {self.fast_path_margin})")
     
-    def _extract_features(self, image_path):
-        """ResNet50 ile derin özellikler çıkar"""
+    def _load_head(self, store):
+        """Sınıflandırma başlığını yükle; uyumsuzsa None (kNN'e düşülür)"""
+        if not self.head_path.exists():
+            logger.warning(f"⚠️ Başlık bulunamadı: {self.head_path} (python train_head.py), kNN kullanılacak")
+            return None
         try:
-            img = Image.open(image_path).convert('RGB')
-            img_tensor = self.transform(img).unsqueeze(0)
-            
-            with torch.no_grad():
-                features = self.resnet(img_tensor)
-                features = features.flatten().numpy()
-            
-            return features
+            head = LinearHead.load(self.head_path)
         except Exception as e:
-            print(f"  ⚠️ Feature extraction hatası: {image_path}")
+            logger.warning(f"⚠️ Başlık okuma hatası: {e}")
             return None
-    
-    def _load_dataset(self):
-        """Dataset'teki tüm görsellerin özelliklerini çıkar"""
-        if not self.dataset_path.exists():
-            print(f"⚠️ Dataset klasörü bulunamadı: {self.dataset_path}")
-            return
         
-        total_loaded = 0
+        if head.model_id != self.model_id or head.dim != store.dim:
+            logger.warning(f"⚠️ Başlık farklı bir model ile eğitilmiş: {head.model_id}, kNN kullanılacak")
+            return None
+        unknown = [c for c in head.categories if c not in self.waste_info]
+        if unknown:
+            logger.warning(f"⚠️ Başlıkta bilinmeyen kategoriler: {', '.join(unknown)}, kNN kullanılacak")
+            return None
+        if head.dataset_hash != store.dataset_hash:
+            logger.warning("⚠️ Başlık dataset'in eski bir sürümüyle eğitilmiş; yeniden eğitmeniz önerilir")
         
-        for category_folder in self.dataset_path.iterdir():
-            if not category_folder.is_dir():
-                continue
-            
-            category = category_folder.name.lower()
-            
-            if category not in self.waste_info:
-                print(f"  ⚠️ Bilinmeyen kategori: {category}")
-                continue
-            
-            self.categories.append(category)
-            
-            # Görselleri bul
-            image_files = (list(category_folder.glob("*.jpg")) + 
-                          list(category_folder.glob("*.jpeg")) + 
-                          list(category_folder.glob("*.png")))
-            
-            print(f"  📂 {category}: {len(image_files)} görsel bulundu")
-            
-            # Her kategoriden max 200 görsel yükle
-            for img_path in image_files[:200]:
-                features = self._extract_features(str(img_path))
-                
-                if features is not None:
-                    self.features_cache[str(img_path)] = {
-                        'features': features,
-                        'category': category
-                    }
-                    total_loaded += 1
-        
-        print(f"✅ {total_loaded} görsel yüklendi, {len(self.categories)} kategori")
+        # Aynı görsel için kNN ve başlık farklı sonuç verebilir
+        self.result_cache.set_namespace(f"{self.model_id}:{store.dataset_hash}:head")
+        logger.info(f"🧠 Sınıflandırma başlığı yüklendi: {self.head_path} "
+                    f"({len(head.layers)} katman, T={head.temperature:.2f})")
+        return head
     
-    def _cosine_similarity(self, vec1, vec2):
-        """İki vektör arasındaki cosine benzerliği"""
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
+    def warm_up(self):
+        """
+        Boş bir görselle tek forward pass yap: ilk istekteki bellek ayırma ve
+        kernel seçimi maliyeti başlangıçta ödenir (YOLO kendi içinde ısınır)
+        """
+        if self.embedder is not None:
+            self.embedder.warm_up()
+    
+    def input_spec(self):
+        """
+        İstemcinin göndermesi önerilen girdi (/api/config): bu boyuta küçültülmüş görsel
+        sunucuda ucuz decode edilir; ham RGB pikseller decode ve resize'ı tamamen atlar
+        """
+        if self.yolo is not None:
+            # YOLO en-boy oranını koruyarak letterbox yapar; ham girdi desteklenmez
+            return {"width": self.yolo.imgsz, "height": self.yolo.imgsz, "resize": "letterbox",
+                    "raw": None}
         
-        if norm1 == 0 or norm2 == 0:
-            return 0
+        width, height = self.decode_size
+        return {
+            "width": width,
+            "height": height,
+            "resize": "stretch",  # en-boy oranı korunmadan (width x height)
+            "raw": {
+                "content_type": RAW_CONTENT_TYPE,
+                "width": width,
+                "height": height,
+                "channels": 3,
+                "dtype": "uint8",
+                "layout": "HWC",  # satır satır RGB
+                "bytes": width * height * 3
+            }
+        }
+    
+    def is_loaded(self):
+        """Dataset (ya da YOLO modeli) yüklü mü?"""
+        if self.yolo is not None:
+            return True
+        return self.embedder is not None and self.embedder.is_loaded()
+    
+    def detect(self, image_path):
+        """
+        Görsel üzerinde atık tespiti yap
+        (dosya yolu, bytes, dosya benzeri nesne veya PIL görseli kabul eder)
+        """
+        return self.detect_batch([image_path])[0]
+    
+    def detect_batch(self, images):
+        """
+        Birden çok görseli tek forward pass ile analiz et; sonuçlar aynı sırada döner
+        """
+        if not self.is_loaded():
+            return [{"success": False, "error": "Dataset yüklü değil"} for _ in images]
+        
+        results = [None] * len(images)
+        keys = [None] * len(images)
+        phashes = [None] * len(images)
+        pending = []
         
-        return dot_product / (norm1 * norm2)
+        for i, image in enumerate(images):
+            cached, keys[i], phashes[i], image = self._cache_lookup(image)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, image))
+        
+        if pending:
+            computed = self._detect_uncached([image for _, image in pending])
+            for (i, _), result in zip(pending, computed):
+                results[i] = result
+                if result["success"] and keys[i] is not None:
+                    self.result_cache.put(keys[i], result, phashes[i])
+        
+        return results
     
-    def _find_similar(self, query_features, top_k=20):
-        """En benzer görselleri bul (Cosine Similarity)"""
-        if query_features is None or len(self.features_cache) == 0:
-            return []
+    def _cache_lookup(self, image):
+        """Sonuç önbelleğinde ara; (sonuç, anahtar, phash, model girdisi) döndür"""
+        if not self.result_cache.enabled or not isinstance(image, (bytes, bytearray, memoryview)):
+            return None, None, None, image
         
-        similarities = []
+        key = content_key(image)
+        result = self.result_cache.get(key)
+        if result is not None:
+            return result, key, None, image
         
-        for img_path, data in self.features_cache.items():
-            dataset_features = data['features']
+        phash = None
+        if self.result_cache.use_phash:
+            try:
+                # Görsel bir kez decode edilir, miss olursa model de aynısını kullanır
+                image = load_image(image, self.decode_size)
+                phash = dhash(image)
+                result = self.result_cache.get_similar(phash)
+                if result is not None:
+                    return result, key, phash, image
+            except Exception:
+                pass  # Decode hatası model tarafında raporlanır
+        
+        self.result_cache.record_miss()
+        return None, key, phash, image
+    
+    def _detect_uncached(self, images):
+        """Önbellekte olmayan görselleri modelden geçir"""
+        if self.yolo is not None:
+            return self._detect_yolo(images)
+        
+        results = [{"success": False, "error": "Görsel işlenemedi"} for _ in images]
+        try:
+            # Query görsellerinin özelliklerini tek batch'te çıkar
+            all_features = self.embedder.extract_features_many(images, self.engine)
+            valid = [i for i, f in enumerate(all_features) if f is not None]
             
-            if dataset_features is None:
-                continue
+            if self.head is not None:
+                with STAGE_SECONDS.time("head"):
+                    head_results = self._classify_head([all_features[i] for i in valid])
+                for i, result in zip(valid, head_results):
+                    results[i] = result
+                with self._stats_lock:
+                    self.path_counts['head'] += len(valid)
+                return results
             
-            # Cosine similarity hesapla
-            similarity = self._cosine_similarity(query_features, dataset_features)
+            # 1. aşama: kategori prototipleri; belirgin olanlar burada cevaplanır
+            fallback = []
+            with STAGE_SECONDS.time("centroid"):
+                centroid_results = self._classify_centroids([all_features[i] for i in valid])
+            for i, result in zip(valid, centroid_results):
+                if result is not None:
+                    results[i] = result
+                else:
+                    fallback.append(i)
             
-            similarities.append({
-                'category': data['category'],
-                'similarity': similarity,
-                'path': img_path
-            })
+            # 2. aşama: kalanlar için en benzer görselleri tek matris çarpımı ile bul
+            with STAGE_SECONDS.time("search"):
+                all_similar = self.embedder.search_many([all_features[i] for i in fallback], top_k=20)
+        except Exception as e:
+            logger.error(f"❌ Tespit hatası: {e}")
+            return [{"success": False, "error": f"Tespit hatası: {str(e)}"} for _ in images]
         
-        # Similarity'ye göre sırala (büyükten küçüğe)
-        similarities.sort(key=lambda x: x['similarity'], reverse=True)
+        for i, similar_images in zip(fallback, all_similar):
+            with STAGE_SECONDS.time("vote"):
+                results[i] = self._classify(similar_images)
         
-        return similarities[:top_k]
-    
-    def is_loaded(self):
-        """Dataset yüklü mü?"""
-        return len(self.features_cache) > 0
+        with self._stats_lock:
+            self.path_counts['centroid'] += len(valid) - len(fallback)
+            self.path_counts['knn'] += len(fallback)
+        
+        return results
     
-    def detect(self, image_path):
+    def _detect_yolo(self, images):
         """
-        Görsel üzerinde atık tespiti yap
+        YOLO ile tek geçişte tespit; en güvenli nesne ana sonuç, hepsi "objects" içinde
+        (görseller tam çözünürlükte açılır: kutular yüklenen görselin pikselleriyle döner)
         """
-        if not self.is_loaded():
-            return {"success": False, "error": "Dataset yüklü değil"}
+        results = [{"success": False, "error": "Görsel işlenemedi"} for _ in images]
+        decoded, positions = [], []
+        for i, image in enumerate(images):
+            try:
+                with STAGE_SECONDS.time("decode"):
+                    decoded.append(load_image(image))
+                positions.append(i)
+            except Exception:
+                logger.warning(f"⚠️ Görsel açılamadı: {describe_input(image)}")
         
         try:
-            # Query görselinin özelliklerini çıkar
-            query_features = self._extract_features(image_path)
+            BATCH_SIZE.observe(len(decoded), self.engine)
+            with STAGE_SECONDS.time("inference"):
+                all_detections = self.yolo.predict(decoded)
+        except Exception as e:
+            logger.error(f"❌ Tespit hatası: {e}")
+            return [{"success": False, "error": f"Tespit hatası: {str(e)}"} for _ in images]
+        
+        for i, detections in zip(positions, all_detections):
+            if not detections:
+                results[i] = {"success": False, "error": "Atık tespit edilemedi"}
+                continue
             
-            if query_features is None:
-                return {"success": False, "error": "Görsel işlenemedi"}
+            best = detections[0]
+            result = self._make_result(best['category'], best['confidence'], "yolo")
+            result["objects"] = []
+            for detection in detections:
+                item = self._make_result(detection['category'], detection['confidence'], "yolo")
+                del item["success"], item["path"]
+                item["box"] = detection['box']  # [x1, y1, x2, y2] piksel (classification'da None)
+                result["objects"].append(item)
+            logger.debug("🎯 YOLO: %s (confidence: %.2f, %d nesne)",
+                         best['category'], best['confidence'], len(detections))
+            results[i] = result
+        
+        with self._stats_lock:
+            self.path_counts['yolo'] += len(positions)
+        
+        return results
+    
+    def _classify_head(self, all_features):
+        """Softmax başlığı: tek matris çarpımı, confidence kalibre olasılığın kendisi"""
+        if not all_features:
+            return []
+        
+        results = []
+        for probs in self.head.predict_proba(np.stack(all_features)):
+            best = int(np.argmax(probs))
+            category = self.head.categories[best]
+            logger.debug("🧠 Başlık: %s (olasılık: %.2f)", category, probs[best])
+            results.append(self._make_result(category, float(probs[best]), "head"))
+        return results
+    
+    def _classify_centroids(self, all_features):
+        """Prototip skorlarında fark yeterliyse sonuç, değilse None (kNN'e düşer)"""
+        if self.fast_path_margin is None or len(self.centroids) == 0 or not all_features:
+            return [None] * len(all_features)
+        
+        results = []
+        queries = normalize_rows(np.stack(all_features))
+        for best, score, margin, scores in self.centroids.classify(queries):
+            if score < 0.3 or margin < self.fast_path_margin:
+                results.append(None)
+                continue
             
-            # En benzer görselleri bul
-            similar_images = self._find_similar(query_features, top_k=20)
+            # Kategori skorlarının softmax payı, kNN'deki oy payına karşılık gelir
+            finite = scores[np.isfinite(scores)]
+            weights = np.exp((finite - score) / self.fast_path_temperature)
+            confidence = min(0.60 + float(1.0 / weights.sum()) * 0.35, 0.95)
             
+            category = self.embedder.label_names[best]
+            logger.debug("⚡ Hızlı yol: %s (skor: %.3f, fark: %.3f)", category, score, margin)
+            results.append(self._make_result(category, confidence, "centroid"))
+        return results
+    
+    def classifier_stats(self):
+        """Hızlı yol / kNN / YOLO cevap sayıları (/health için)"""
+        with self._stats_lock:
+            total = self.path_counts['centroid'] + self.path_counts['knn']
+            return {
+                "engine": self.engine,
+                "fast_path_margin": self.fast_path_margin,
+                "fast_path_temperature": self.fast_path_temperature,
+                "prototypes": len(self.centroids),
+                "centroid": self.path_counts['centroid'],
+                "knn": self.path_counts['knn'],
+                "head": self.path_counts['head'],
+                "yolo": self.path_counts['yolo'],
+                "fast_path_rate": round(self.path_counts['centroid'] / total, 4) if total else 0.0,
+            }
+    
+    def _make_result(self, category, confidence, path):
+        waste_data = self.waste_info.get(category, self.waste_info['plastic'])
+        return {
+            "success": True,
+            "waste_type": category,
+            "confidence": round(confidence, 2),
+            "bin_type": waste_data['bin_type'],
+            "bin_color": waste_data['bin_color'],
+            "recyclable": waste_data['recyclable'],
+            "points": waste_data['points'],
+            "name_tr": waste_data['name_tr'],
+            "icon": waste_data['icon'],
+            "path": path
+        }
+    
+    def _classify(self, similar_images):
+        """En yakın komşuların ağırlıklı oylaması ile sınıflandır"""
+        try:
             if not similar_images or similar_images[0]['similarity'] < 0.3:
                 return {"success": False, "error": "Yeterli benzerlik bulunamadı"}
             
@@ -266,38 +463,17 @@ class WasteDetector:
             confidence = 0.60 + (confidence * 0.35)
             confidence = min(confidence, 0.95)
             
-            waste_data = self.waste_info.get(best_category, self.waste_info['plastic'])
-            
-            # Debug bilgisi
-            print(f"  🎯 Tespit: {best_category} (confidence: {confidence:.2f})")
-            print(f"  📊 Top 5 benzer görseller:")
-            for i, sim in enumerate(similar_images[:5]):
-                print(f"     {i+1}. {sim['category']} (similarity: {sim['similarity']:.3f})")
+            # Debug bilgisi (sadece DEBUG seviyesinde hazırlanır)
+            if logger.isEnabledFor(logging.DEBUG):
+                top = ", ".join(f"{sim['category']} {sim['similarity']:.3f}" for sim in similar_images[:5])
+                logger.debug("🎯 Tespit: %s (confidence: %.2f), top 5: %s", best_category, confidence, top)
             
-            return {
-                "success": True,
-                "waste_type": best_category,
-                "confidence": round(confidence, 2),
-                "bin_type": waste_data['bin_type'],
-                "bin_color": waste_data['bin_color'],
-                "recyclable": waste_data['recyclable'],
-                "points": waste_data['points'],
-                "name_tr": waste_data['name_tr'],
-                "icon": waste_data['icon']
-            }
+            return self._make_result(best_category, confidence, "knn")
             
         except Exception as e:
-            print(f"  ❌ Hata: {str(e)}")
+            logger.error(f"❌ Tespit hatası: {e}")
             return {"success": False, "error": f"Tespit hatası: {str(e)}"}
     
     def get_waste_types(self):
         """Desteklenen atık türlerini döndür"""
-        return {
-            waste_type: {
-                'name': data['name_tr'],
-                'bin': data['bin_type'],
-                'recyclable': data['recyclable'],
-                'points': data['points']
-            }
-            for waste_type, data in self.waste_info.items()
-        }
\ No newline at end of file
+        return waste_types(self.waste_info)
\ No newline at end of file
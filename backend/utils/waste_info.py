@@ -0,0 +1,77 @@
+"""
+Atık türü bilgileri. Sadece sözlük içerir (numpy / torch importu yok): main.py
+/api/waste-types cevabını model yüklenmeden buradan verir.
+"""
+
+# Atık türü bilgileri (dataset'te sadece bu kategori klasörleri kullanılır)
+WASTE_INFO = {
+    'plastic': {
+        'name_tr': 'Plastik',
+        'bin_type': 'Sarı Kutu',
+        'bin_color': '#FFEB3B',
+        'recyclable': True,
+        'points': 10,
+        'icon': '♻️'
+    },
+    'glass': {
+        'name_tr': 'Cam',
+        'bin_type': 'Yeşil Kutu',
+        'bin_color': '#4CAF50',
+        'recyclable': True,
+        'points': 15,
+        'icon': '🫙'
+    },
+    'metal': {
+        'name_tr': 'Metal',
+        'bin_type': 'Gri Kutu',
+        'bin_color': '#9E9E9E',
+        'recyclable': True,
+        'points': 12,
+        'icon': '🥫'
+    },
+    'paper': {
+        'name_tr': 'Kağıt',
+        'bin_type': 'Mavi Kutu',
+        'bin_color': '#2196F3',
+        'recyclable': True,
+        'points': 8,
+        'icon': '📄'
+    },
+    'cardboard': {
+        'name_tr': 'Karton',
+        'bin_type': 'Mavi Kutu',
+        'bin_color': '#2196F3',
+        'recyclable': True,
+        'points': 10,
+        'icon': '📦'
+    },
+    'trash': {
+        'name_tr': 'Diğer Atık',
+        'bin_type': 'Siyah Kutu',
+        'bin_color': '#424242',
+        'recyclable': False,
+        'points': 5,
+        'icon': '🗑️'
+    },
+    'textile': {
+        'name_tr': 'Tekstil',
+        'bin_type': 'Giysi Kumbarası',
+        'bin_color': '#E91E63',
+        'recyclable': True,
+        'points': 20,
+        'icon': '👕'
+    }
+}
+
+
+def waste_types(waste_info=WASTE_INFO):
+    """/api/waste-types özeti: tür -> ad, kutu, geri dönüşüm, puan"""
+    return {
+        waste_type: {
+            'name': data['name_tr'],
+            'bin': data['bin_type'],
+            'recyclable': data['recyclable'],
+            'points': data['points']
+        }
+        for waste_type, data in waste_info.items()
+    }
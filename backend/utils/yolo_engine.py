@@ -0,0 +1,99 @@
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class YoloEngine:
+    """
+    Ultralytics YOLO modeli ile tek geçişte tespit (train_yolo.py / download_model.py
+    çıktısı models/best.pt). Hem detection hem classification modellerini destekler.
+
+    class_map: model sınıf adı -> waste_info anahtarı (ör. {"biodegradable": "trash"});
+    eşlenmeyen adlar küçük harfe çevrilip doğrudan kullanılır, waste_info'da yoksa atlanır.
+    """
+
+    def __init__(self, model_path, imgsz=640, conf=0.25, iou=0.45, max_objects=10,
+                 fuse=True, class_map=None, known_categories=None, device="cpu"):
+        from ultralytics import YOLO
+
+        self.model_path = Path(model_path)
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"YOLO modeli bulunamadı: {self.model_path}")
+
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_objects = max_objects
+        self.device = device
+
+        self.model = YOLO(str(self.model_path))
+        if fuse:
+            try:
+                # Conv + BatchNorm katmanlarını birleştir (inference'ta daha az işlem)
+                self.model.fuse()
+            except Exception as e:
+                logger.warning(f"⚠️ YOLO fuse atlandı: {e}")
+
+        self.task = getattr(self.model, "task", "detect")
+        self.names = {int(k): v for k, v in self.model.names.items()}
+        self.class_map = self._build_class_map(class_map or {}, known_categories)
+
+        # İlk çağrıdaki predictor kurulumunu (ve kernel seçimini) başlangıçta öde
+        self.predict([Image.new('RGB', (imgsz, imgsz))])
+
+    def _build_class_map(self, class_map, known_categories):
+        """Model sınıf id'si -> waste_info anahtarı (bilinmeyenler None)"""
+        mapping = {}
+        for class_id, name in self.names.items():
+            category = class_map.get(name, class_map.get(name.lower(), name.lower()))
+            if known_categories is not None and category not in known_categories:
+                logger.warning(f"⚠️ YOLO sınıfı eşlenemedi: {name}")
+                category = None
+            mapping[class_id] = category
+        return mapping
+
+    @property
+    def model_id(self):
+        """Sonuç önbelleği namespace'i için model dosyası kimliği"""
+        stat = self.model_path.stat()
+        return f"yolo:{self.model_path.name}:{stat.st_size}:{stat.st_mtime_ns}:{self.imgsz}"
+
+    def predict(self, images):
+        """
+        PIL görselleri için tespit listeleri döndürür (aynı sırada); her tespit
+        {'category', 'confidence', 'box'} sözlüğüdür, güvene göre azalan sırada.
+        """
+        if not images:
+            return []
+
+        results = self.model.predict(
+            source=list(images), imgsz=self.imgsz, conf=self.conf, iou=self.iou,
+            max_det=self.max_objects, device=self.device, verbose=False
+        )
+        return [self._detections(result) for result in results]
+
+    def _detections(self, result):
+        if self.task == "classify" or getattr(result, "probs", None) is not None:
+            class_id = int(result.probs.top1)
+            category = self.class_map.get(class_id)
+            if category is None:
+                return []
+            return [{'category': category, 'confidence': float(result.probs.top1conf), 'box': None}]
+
+        detections = []
+        boxes = result.boxes
+        for class_id, confidence, box in zip(boxes.cls.tolist(), boxes.conf.tolist(),
+                                             boxes.xyxy.tolist()):
+            category = self.class_map.get(int(class_id))
+            if category is None:
+                continue
+            detections.append({
+                'category': category,
+                'confidence': float(confidence),
+                'box': [round(v, 1) for v in box],
+            })
+        detections.sort(key=lambda d: d['confidence'], reverse=True)
+        return detections
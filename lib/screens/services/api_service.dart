@@ -1,4 +1,6 @@
 import 'dart:io';
+import 'dart:typed_data';
+import 'dart:ui' as ui;
 import 'package:http/http.dart' as http;
 import 'dart:convert';
 import 'package:http_parser/http_parser.dart';
@@ -16,9 +18,50 @@ class ApiService {
   // PC IP'niz ile de test edebilirsiniz:
   // static const String baseUrl = 'http://192.168.1.XXX:8000';
 
+  // Sunucunun tercih ettiği girdi (/api/config); ilk analizde alınır,
+  // ham upload reddedilirse unutulur ve bir sonraki analizde yeniden alınır
+  Map<String, dynamic>? _inputSpec;
+
   /// Görseli backend'e gönder ve analiz et
   Future<Map<String, dynamic>?> analyzeWaste(File imageFile) async {
 
+      // Sunucu ham pikselleri kabul ediyorsa görsel cihazda model boyutuna
+      // küçültülüp gönderilir: daha az veri, sunucuda decode / resize yok
+      final raw = (await getInputSpec())?['raw'];
+      Uint8List? pixels;
+      if (raw != null) {
+        try {
+          pixels = await _toRawRgb(imageFile, raw['width'], raw['height']);
+        } catch (e) {
+          // Cihazda çözülemeyen görseller (ör. bazı HEIC'ler) dosya olarak gönderilir;
+          // sunucu decode edebilir
+          print('⚠️ Ham girdi hazırlanamadı, dosya olarak gönderiliyor: $e');
+        }
+      }
+      if (pixels != null) {
+        final rawRequest = http.MultipartRequest(
+          'POST',
+          Uri.parse('$baseUrl/api/analyze'),
+        );
+        rawRequest.files.add(
+          http.MultipartFile.fromBytes(
+            'file',
+            pixels,
+            filename: 'image.rgb',
+            contentType: MediaType.parse(raw['content_type']),
+          ),
+        );
+        print('📤 Gönderiliyor: ${raw['width']}x${raw['height']} ham RGB');
+        final response = await _post(rawRequest);
+        if (response.statusCode != 415) return _handle(response);
+
+        // 415: ham girdi reddedildi, sunucu ayarı değişmiş olabilir (model boyutu,
+        // ham girdi kapalı). Önbellekteki spec silinir, görsel bir kez dosya olarak
+        // yeniden gönderilir (400 ise normal analiz sonucudur, tekrar denenmez)
+        print('⚠️ Ham girdi reddedildi (${response.body}), dosya olarak gönderiliyor');
+        _inputSpec = null;
+      }
+
       var request = http.MultipartRequest(
         'POST',
         Uri.parse('$baseUrl/api/analyze'),
@@ -49,13 +92,19 @@ class ApiService {
       );
 
       print('📤 Gönderiliyor: $fileName (${contentType.mimeType})');
+      return _handle(await _post(request));
+  }
 
+  Future<http.Response> _post(http.MultipartRequest request) async {
     // Backend'e gönder (Render cold start için 120sn timeout)
       var streamedResponse = await request.send().timeout(const Duration(seconds: 120));
       var response = await http.Response.fromStream(streamedResponse);
 
       print('📥 Yanıt: ${response.statusCode}');
+      return response;
+  }
 
+  Map<String, dynamic>? _handle(http.Response response) {
       if (response.statusCode == 200) {
         final jsonResponse = json.decode(response.body);
         print('✅ Başarılı: $jsonResponse');
@@ -66,6 +115,49 @@ class ApiService {
       }
   }
 
+  /// Sunucunun tercih ettiği girdi boyutu / formatı (alınamazsa null: dosya olduğu gibi gönderilir)
+  Future<Map<String, dynamic>?> getInputSpec() async {
+    if (_inputSpec != null) return _inputSpec;
+    try {
+      final response = await http
+          .get(
+            Uri.parse('$baseUrl/api/config'),
+          )
+          .timeout(const Duration(seconds: 30));
+
+      if (response.statusCode == 200) {
+        _inputSpec = json.decode(response.body)['input'];
+      }
+    } catch (e) {
+      print('Config hatası: $e');
+    }
+    return _inputSpec;
+  }
+
+  /// Görseli width x height boyutunda (en-boy oranı korunmadan) ham RGB baytlarına çevir
+  Future<Uint8List> _toRawRgb(File imageFile, int width, int height) async {
+    // Decode doğrudan hedef boyutta yapılır (EXIF yönü uygulanır)
+    final codec = await ui.instantiateImageCodec(
+      await imageFile.readAsBytes(),
+      targetWidth: width,
+      targetHeight: height,
+    );
+    final frame = await codec.getNextFrame();
+    final rgba = await frame.image.toByteData(format: ui.ImageByteFormat.rawRgba);
+    frame.image.dispose();
+    codec.dispose();
+
+    // RGBA -> RGB (fotoğraflar opak; alfa kanalı atılır)
+    final pixels = rgba!.buffer.asUint8List();
+    final rgb = Uint8List(width * height * 3);
+    for (var i = 0, j = 0; j < rgb.length; i += 4, j += 3) {
+      rgb[j] = pixels[i];
+      rgb[j + 1] = pixels[i + 1];
+      rgb[j + 2] = pixels[i + 2];
+    }
+    return rgb;
+  }
+
   /// Backend sağlık kontrolü
   Future<bool> checkHealth() async {
     try {